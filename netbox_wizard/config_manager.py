@@ -3,23 +3,27 @@ Configuration Manager for NetBox Import Wizard
 Handles secure credential storage and application preferences
 """
 import json
+import logging
+import os
 from pathlib import Path
-from typing import Dict, Optional, List
-from dataclasses import dataclass, asdict
+from typing import Dict, Optional, List, Tuple
+from dataclasses import dataclass
 from datetime import datetime
 
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import (
     QMessageBox, QPushButton, QHBoxLayout, QLineEdit,
     QVBoxLayout, QLabel, QDialog
 )
 
-# Import your credential manager - adjust path as needed
 try:
-    from helpers.credslib import SecureCredentials
+    import orjson
+
+    ORJSON_AVAILABLE = True
 except ImportError:
-    # Fallback if credslib doesn't exist
-    print("Warning: credslib not found. Credential storage will be disabled.")
-    SecureCredentials = None
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -47,20 +51,55 @@ class ConfigManager:
 
     def __init__(self, app_name: str = "NetBoxImportWizard"):
         self.app_name = app_name
+
+        # Import your credential manager - adjust path as needed. Deferred to here
+        # because credslib pulls in cryptography, keyring and yaml at import time.
+        try:
+            from helpers.credslib import SecureCredentials
+        except ImportError:
+            # Fallback if credslib doesn't exist
+            logger.warning("credslib not found. Credential storage will be disabled.")
+            SecureCredentials = None
+
         self.credentials = SecureCredentials(app_name) if SecureCredentials else None
 
         # Create config directory if it doesn't exist
         if self.credentials:
             self.config_file = self.credentials.config_dir / "config.json"
+            self.creds_file = self.credentials.config_dir / "credentials.yaml"
         else:
             # Fallback to local config
             config_dir = Path.home() / f".{app_name.lower()}"
             config_dir.mkdir(exist_ok=True)
             self.config_file = config_dir / "config.json"
+            self.creds_file = None
 
         self._connections: List[NetBoxConnection] = []
+        self._conn_by_name: Dict[str, NetBoxConnection] = {}
         self._preferences = AppPreferences()
 
+        # Parsed file caches, keyed by (st_mtime_ns, st_size) of the file on disk
+        self._config_stat = None
+        self._creds_cache: Optional[List[Dict]] = None
+        self._creds_by_key: Dict[str, Dict] = {}
+        self._creds_stat = None
+        self._creds_dirty = False
+        self._creds_flush_scheduled = False
+
+        # Coalesce bursts of config saves (e.g. preference updates) into one write
+        self._save_timer = QTimer()
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self._do_save_config)
+
+    @staticmethod
+    def _stat_key(path: Path):
+        """Return a cheap change-detection key for a file, or None if it is missing"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
     def is_initialized(self) -> bool:
         """Check if credential system is initialized"""
         if not self.credentials:
@@ -74,52 +113,130 @@ class ConfigManager:
         return self.credentials.setup_new_credentials(password)
 
     def unlock(self, password: str) -> bool:
-        """Unlock the credential manager"""
+        """Unlock the credential manager
+
+        Only the master password and config.json are touched here; credentials.yaml
+        is read and decrypted on the first token lookup or mutation.
+        """
         if not self.credentials:
             self._load_config()
             return True  # No credentials system available
 
         success = self.credentials.unlock(password)
         if success:
+            # Drop anything cached under a previous unlock so the next access re-reads
+            if not self._creds_dirty:
+                self._set_creds_cache(None)
+                self._creds_stat = None
             self._load_config()
         return success
 
     def _load_config(self):
         """Load non-sensitive configuration from file"""
-        if not self.config_file.exists():
+        stat_key = self._stat_key(self.config_file)
+        if stat_key is None or stat_key == self._config_stat:
             return
 
         try:
-            with open(self.config_file, 'r') as f:
-                data = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                raw = f.read()
+            data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
 
             # Load connections (without tokens)
             self._connections = [
                 NetBoxConnection(**conn) for conn in data.get('connections', [])
             ]
+            self._conn_by_name = {conn.name: conn for conn in self._connections}
 
             # Load preferences
             prefs_data = data.get('preferences', {})
             self._preferences = AppPreferences(**prefs_data)
+            self._config_stat = stat_key
 
-        except Exception as e:
-            print(f"Error loading config: {e}")
+        except (OSError, ValueError, TypeError):
+            # ValueError covers json/orjson decode errors, TypeError unknown dataclass fields
+            logger.exception("Error loading config from %s", self.config_file)
 
-    def _save_config(self):
+    def _save_config(self, delay_ms: int = 200):
+        """Schedule a debounced save of the non-sensitive configuration"""
+        self._save_timer.start(delay_ms)
+
+    def _do_save_config(self):
         """Save non-sensitive configuration to file"""
+        self._save_timer.stop()
         # Create directory if it doesn't exist
         self.config_file.parent.mkdir(parents=True, exist_ok=True)
 
         data = {
-            'connections': [asdict(conn) for conn in self._connections],
-            'preferences': asdict(self._preferences)
+            # Both dataclasses hold only flat JSON-serializable fields, so a shallow
+            # copy of the instance dict is enough (asdict() deep-copies every field)
+            'connections': [vars(conn).copy() for conn in self._connections],
+            'preferences': vars(self._preferences).copy()
         }
 
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving config: {e}")
+            if ORJSON_AVAILABLE:
+                payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+            else:
+                payload = json.dumps(data, indent=2).encode('utf-8')
+            with open(self.config_file, 'wb') as f:
+                f.write(payload)
+            self._config_stat = self._stat_key(self.config_file)
+        except (OSError, ValueError, TypeError):
+            logger.exception("Error saving config to %s", self.config_file)
+
+    def _get_creds(self) -> Tuple[List[Dict], Dict[str, Dict]]:
+        """Load decrypted credentials, re-parsing the YAML only when the file changed
+
+        Returns the credential list (kept for serialization order) and an index by key.
+        """
+        if self._creds_dirty:
+            # In-memory state is newer than the file until the pending flush runs
+            return self._creds_cache, self._creds_by_key
+
+        stat_key = self._stat_key(self.creds_file)
+        if self._creds_cache is None or stat_key != self._creds_stat:
+            self._set_creds_cache(self.credentials.load_credentials(self.creds_file))
+            self._creds_stat = stat_key
+        return self._creds_cache, self._creds_by_key
+
+    def _set_creds_cache(self, creds: Optional[List[Dict]]):
+        """Replace the cached credential list and rebuild its key index"""
+        self._creds_cache = creds
+        self._creds_by_key = {cred.get('key'): cred for cred in creds} if creds else {}
+
+    def _update_creds(self, creds: List[Dict]):
+        """Replace cached credentials in memory and schedule a coalesced write"""
+        self._set_creds_cache(creds)
+        self._creds_dirty = True
+        if not self._creds_flush_scheduled:
+            self._creds_flush_scheduled = True
+            QTimer.singleShot(0, self._flush_creds)
+
+    def _flush_creds(self):
+        """Write pending credential changes to disk via a temp file and atomic replace"""
+        self._creds_flush_scheduled = False
+        if not self._creds_dirty or not self.credentials or not self.credentials.is_unlocked():
+            return
+
+        creds_file = self.creds_file
+        tmp_file = creds_file.with_name(creds_file.name + ".tmp")
+        try:
+            self.credentials.save_credentials(self._creds_cache, tmp_file)
+            os.replace(tmp_file, creds_file)
+        except Exception:
+            # Runs from a timer callback, so never let an encryption/YAML error escape
+            logger.exception("Error saving credentials to %s", creds_file)
+            return
+
+        self._creds_dirty = False
+        self._creds_stat = self._stat_key(creds_file)
+
+    def flush(self):
+        """Synchronously write any pending changes, e.g. on application exit"""
+        if self._save_timer.isActive():
+            self._do_save_config()
+        self._flush_creds()
 
     def _store_token(self, name: str, token: str) -> bool:
         """Store token securely"""
@@ -130,28 +247,23 @@ class ConfigManager:
             token_key = f"netbox_token_{name}"
 
             # Save to credentials file
-            creds_file = self.credentials.config_dir / "credentials.yaml"
-            current_creds = self.credentials.load_credentials(creds_file)
+            current_creds, creds_by_key = self._get_creds()
 
             # Update or add token
-            token_found = False
-            for cred in current_creds:
-                if cred.get('key') == token_key:
-                    cred['password'] = token
-                    token_found = True
-                    break
-
-            if not token_found:
+            cred = creds_by_key.get(token_key)
+            if cred is not None:
+                cred['password'] = token
+            else:
                 current_creds.append({
                     'key': token_key,
                     'password': token,
                     'type': 'netbox_api_token'
                 })
 
-            self.credentials.save_credentials(current_creds, creds_file)
+            self._update_creds(current_creds)
             return True
-        except Exception as e:
-            print(f"Error storing token: {e}")
+        except Exception:
+            logger.exception("Error storing token for %s", name)
             return False
 
     def add_connection(self, name: str, url: str, token: str, verify_ssl: bool = False) -> bool:
@@ -164,11 +276,12 @@ class ConfigManager:
         # Create new connection
         connection = NetBoxConnection(name=name, url=url, verify_ssl=verify_ssl)
         self._connections.append(connection)
+        self._conn_by_name[name] = connection
 
         # Store token securely if credentials system available
         success = self._store_token(name, token)
         if not success:
-            print(f"Warning: Could not securely store token for {name}")
+            logger.warning("Could not securely store token for %s", name)
 
         self._save_config()
         return True
@@ -185,17 +298,14 @@ class ConfigManager:
         # Update token
         success = self._store_token(name, token)
         if not success:
-            print(f"Warning: Could not securely store token for {name}")
+            logger.warning("Could not securely store token for %s", name)
 
         self._save_config()
         return True
 
     def get_connection(self, name: str) -> Optional[NetBoxConnection]:
         """Get connection by name"""
-        for conn in self._connections:
-            if conn.name == name:
-                return conn
-        return None
+        return self._conn_by_name.get(name)
 
     def list_connections(self) -> List[NetBoxConnection]:
         """Get all configured connections"""
@@ -207,36 +317,34 @@ class ConfigManager:
             return None
 
         try:
-            creds_file = self.credentials.config_dir / "credentials.yaml"
-            current_creds = self.credentials.load_credentials(creds_file)
+            _, creds_by_key = self._get_creds()
 
-            token_key = f"netbox_token_{name}"
-            for cred in current_creds:
-                if cred.get('key') == token_key:
-                    return cred.get('password')
+            cred = creds_by_key.get(f"netbox_token_{name}")
+            if cred is not None:
+                return cred.get('password')
 
-        except Exception as e:
-            print(f"Error retrieving token: {e}")
+        except Exception:
+            logger.exception("Error retrieving token for %s", name)
 
         return None
 
     def delete_connection(self, name: str) -> bool:
         """Delete a connection and its token"""
         # Remove from connections list
-        self._connections = [conn for conn in self._connections if conn.name != name]
+        if self._conn_by_name.pop(name, None) is not None:
+            self._connections = [conn for conn in self._connections if conn.name != name]
 
         # Remove token from credentials if available
         if self.credentials and self.credentials.is_unlocked():
             try:
-                creds_file = self.credentials.config_dir / "credentials.yaml"
-                current_creds = self.credentials.load_credentials(creds_file)
+                current_creds, creds_by_key = self._get_creds()
 
                 token_key = f"netbox_token_{name}"
-                current_creds = [cred for cred in current_creds if cred.get('key') != token_key]
-
-                self.credentials.save_credentials(current_creds, creds_file)
-            except Exception as e:
-                print(f"Error deleting token: {e}")
+                if token_key in creds_by_key:
+                    current_creds = [cred for cred in current_creds if cred.get('key') != token_key]
+                    self._update_creds(current_creds)
+            except Exception:
+                logger.exception("Error deleting token for %s", name)
 
         self._save_config()
         return True
@@ -317,6 +425,14 @@ class MasterPasswordDialog(QDialog):
 class MasterPasswordSetupDialog(QDialog):
     """Dialog for setting up master password"""
 
+    # (label text, stylesheet) per strength bucket: empty, too short, good, strong
+    STRENGTH_LEVELS = (
+        ("Password strength: ", ""),
+        ("Password strength: Too short", "color: red"),
+        ("Password strength: Good", "color: orange"),
+        ("Password strength: Strong", "color: green"),
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Setup Credential Storage")
@@ -340,6 +456,7 @@ class MasterPasswordSetupDialog(QDialog):
 
         # Password strength indicator
         self.strength_label = QLabel("Password strength: ")
+        self._last_strength = 0
         layout.addWidget(self.strength_label)
 
         buttons = QHBoxLayout()
@@ -359,18 +476,24 @@ class MasterPasswordSetupDialog(QDialog):
 
     def update_strength(self, password: str):
         """Update password strength indicator"""
-        if len(password) == 0:
-            self.strength_label.setText("Password strength: ")
-            self.strength_label.setStyleSheet("")
-        elif len(password) < 8:
-            self.strength_label.setText("Password strength: Too short")
-            self.strength_label.setStyleSheet("color: red")
-        elif len(password) < 12:
-            self.strength_label.setText("Password strength: Good")
-            self.strength_label.setStyleSheet("color: orange")
+        length = len(password)
+        if length == 0:
+            strength = 0
+        elif length < 8:
+            strength = 1
+        elif length < 12:
+            strength = 2
         else:
-            self.strength_label.setText("Password strength: Strong")
-            self.strength_label.setStyleSheet("color: green")
+            strength = 3
+
+        # Restyling re-parses the stylesheet, so only touch the label on a bucket change
+        if strength == self._last_strength:
+            return
+        self._last_strength = strength
+
+        text, style = self.STRENGTH_LEVELS[strength]
+        self.strength_label.setText(text)
+        self.strength_label.setStyleSheet(style)
 
     def validate_and_accept(self):
         password = self.password_input.text()
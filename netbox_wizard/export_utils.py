@@ -2,19 +2,80 @@
 Export utilities for NetBox Import Wizard
 Handles CSV export from the device discovery table
 """
-import csv
-from datetime import datetime
 from pathlib import Path
-from PyQt6.QtWidgets import QFileDialog, QMessageBox, QTableWidget
-from PyQt6.QtCore import QStandardPaths
+from typing import List, Tuple
+from PyQt6.QtWidgets import QFileDialog, QMessageBox
+from PyQt6.QtCore import QStandardPaths, Qt
 
+from ui_components import (
+    DeviceTableWidget, STATUS_NEW, STATUS_MATCH, CHOICE_COLUMNS, COL_NAME, COL_IP,
+    COL_DISCOVERED_PLATFORM, COL_STATUS
+)
 
-def export_device_table_to_csv(table_widget: QTableWidget, parent_widget=None) -> bool:
+# 1 MiB file buffer so large exports reach the OS in a handful of writes
+_WRITE_BUFFER_SIZE = 1 << 20
+
+
+def compute_summary_and_rows(table_widget: DeviceTableWidget, build_rows: bool = True) -> Tuple[List[list], dict]:
+    """Read every table row once, returning CSV rows and summary statistics together"""
+    model = table_widget.model()
+    selected_rows = table_widget.selected_rows
+
+    total_devices = model.rowCount()
+    configured_devices = 0
+    new_devices = 0
+    existing_devices = 0
+    rows = []
+
+    for row, values in enumerate(model.rows):
+        # NetBox Platform, Site, Role, Device Type hold the selected NetBox id, or None
+        configured = all(values[col] for col in CHOICE_COLUMNS)
+        if configured:
+            configured_devices += 1
+
+        status_index = model.index(row, COL_STATUS)
+        status_code = model.data(status_index, Qt.ItemDataRole.UserRole)
+        if status_code == STATUS_NEW:
+            new_devices += 1
+        elif status_code == STATUS_MATCH:
+            existing_devices += 1
+
+        if not build_rows:
+            continue
+
+        combo_texts = [model.choice_text(col, values[col]) if values[col] else '-- Not Selected --'
+                       for col in CHOICE_COLUMNS]
+
+        rows.append([
+            'Yes' if row in selected_rows else 'No',
+            values[COL_NAME],
+            values[COL_IP],
+            values[COL_DISCOVERED_PLATFORM],
+            combo_texts[0],
+            model.data(status_index),
+            *combo_texts[1:],
+        ])
+
+    summary = {
+        'total': total_devices,
+        'selected': len(selected_rows),
+        'configured': configured_devices,
+        'new': new_devices,
+        'existing': existing_devices
+    }
+    return rows, summary
+
+
+def export_device_table_to_csv(table_widget: DeviceTableWidget, parent_widget=None) -> bool:
     """Export current device table to CSV"""
     if table_widget.rowCount() == 0:
         QMessageBox.information(parent_widget, "No Data", "No devices to export")
         return False
 
+    # Only needed on the export path
+    import csv
+    from datetime import datetime
+
     # Get default documents directory
     documents_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DocumentsLocation)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -33,7 +94,9 @@ def export_device_table_to_csv(table_widget: QTableWidget, parent_widget=None) -
         return False
 
     try:
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+        rows, summary = compute_summary_and_rows(table_widget)
+
+        with open(file_path, 'w', newline='', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE) as csvfile:
             writer = csv.writer(csvfile)
 
             # Write header
@@ -49,45 +112,12 @@ def export_device_table_to_csv(table_widget: QTableWidget, parent_widget=None) -
                 'Device Type'
             ]
             writer.writerow(headers)
-
-            # Write data rows
-            for row in range(table_widget.rowCount()):
-                row_data = []
-
-                # Import checkbox
-                import_checkbox = table_widget.cellWidget(row, 0)
-                row_data.append('Yes' if import_checkbox and import_checkbox.isChecked() else 'No')
-
-                # Device Name, IP, Discovered Platform (regular items)
-                for col in [1, 2, 3]:
-                    item = table_widget.item(row, col)
-                    row_data.append(item.text() if item else '')
-
-                # NetBox Platform (combo box)
-                platform_combo = table_widget.cellWidget(row, 4)
-                if platform_combo and platform_combo.currentData():
-                    row_data.append(platform_combo.currentText())
-                else:
-                    row_data.append('-- Not Selected --')
-
-                # NetBox Status (regular item)
-                status_item = table_widget.item(row, 5)
-                row_data.append(status_item.text() if status_item else '')
-
-                # Site, Role, Device Type (combo boxes)
-                for col in [6, 7, 8]:
-                    combo = table_widget.cellWidget(row, col)
-                    if combo and combo.currentData():
-                        row_data.append(combo.currentText())
-                    else:
-                        row_data.append('-- Not Selected --')
-
-                writer.writerow(row_data)
+            writer.writerows(rows)
 
         QMessageBox.information(
             parent_widget,
             "Export Complete",
-            f"Device discovery data exported to:\n{file_path}\n\n{table_widget.rowCount()} devices exported"
+            f"Device discovery data exported to:\n{file_path}\n\n{summary['total']} devices exported"
         )
         return True
 
@@ -100,44 +130,7 @@ def export_device_table_to_csv(table_widget: QTableWidget, parent_widget=None) -
         return False
 
 
-def get_device_table_summary(table_widget: QTableWidget) -> dict:
+def get_device_table_summary(table_widget: DeviceTableWidget) -> dict:
     """Get summary statistics for the device table"""
-    total_devices = table_widget.rowCount()
-    selected_devices = 0
-    configured_devices = 0
-    new_devices = 0
-    existing_devices = 0
-
-    for row in range(total_devices):
-        # Count selected
-        import_checkbox = table_widget.cellWidget(row, 0)
-        if import_checkbox and import_checkbox.isChecked():
-            selected_devices += 1
-
-        # Count configured (has platform, site, role, type)
-        platform_combo = table_widget.cellWidget(row, 4)
-        site_combo = table_widget.cellWidget(row, 6)
-        role_combo = table_widget.cellWidget(row, 7)
-        type_combo = table_widget.cellWidget(row, 8)
-
-        if (platform_combo and platform_combo.currentData() and
-                site_combo and site_combo.currentData() and
-                role_combo and role_combo.currentData() and
-                type_combo and type_combo.currentData()):
-            configured_devices += 1
-
-        # Count new vs existing
-        status_item = table_widget.item(row, 5)
-        if status_item:
-            if "New device" in status_item.text():
-                new_devices += 1
-            elif "match" in status_item.text():
-                existing_devices += 1
-
-    return {
-        'total': total_devices,
-        'selected': selected_devices,
-        'configured': configured_devices,
-        'new': new_devices,
-        'existing': existing_devices
-    }
\ No newline at end of file
+    _, summary = compute_summary_and_rows(table_widget, build_rows=False)
+    return summary
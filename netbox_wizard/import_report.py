@@ -3,20 +3,115 @@ Import Report Generation for NetBox Import Wizard
 Generates CSV and Excel reports for administrative follow-up
 """
 import csv
+from collections import Counter
 from datetime import datetime
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Dict, Optional
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
 from PyQt6.QtCore import QStandardPaths
 
-try:
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-
+# Larger write buffer so big CSV reports reach the OS in a few large writes
+_WRITE_BUFFER_SIZE = 1 << 20
+
+# Excel column widths are fitted to the first WIDTH_SCAN_LIMIT data rows only;
+# past that the widest values have almost always been seen already
+WIDTH_SCAN_LIMIT = 200
+
+# openpyxl is only needed for Excel reports, so it is imported on first use by
+# _load_openpyxl(); None means availability has not been checked yet
+EXCEL_AVAILABLE = None
+
+# The openpyxl entry points and shared report styles, once loaded
+_excel = None
+
+
+def _load_openpyxl() -> Optional[SimpleNamespace]:
+    """Import openpyxl and build the shared report styles once; None if it is not installed"""
+    global EXCEL_AVAILABLE, _excel
+
+    if EXCEL_AVAILABLE is not None:
+        return _excel
+
+    try:
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+        from openpyxl.utils import get_column_letter
+    except ImportError:
+        EXCEL_AVAILABLE = False
+        return None
+
+    def solid_fill(color):
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    # Shared report styles, built once instead of per cell
+    _excel = SimpleNamespace(
+        Workbook=openpyxl.Workbook,
+        WriteOnlyCell=WriteOnlyCell,
+        get_column_letter=get_column_letter,
+        title_font=Font(bold=True, size=16),
+        section_font=Font(bold=True, size=14),
+        header_font=Font(bold=True),
+        header_fill_blue=solid_fill("366092"),
+        header_fill_orange=solid_fill("FFA500"),
+        fill_success=solid_fill("90EE90"),
+        fill_fail=solid_fill("FFB6C1"),
+        fill_admin_entry=solid_fill("FFFACD"),
+    )
     EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
+    return _excel
+
+
+def _styled_cell(xl: SimpleNamespace, ws, value, font=None, fill=None):
+    """Build a write-only cell carrying the given shared styles"""
+    cell = xl.WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    return cell
+
+
+def _project(result: Dict) -> Tuple:
+    """Project an import result onto the detail columns that follow Status:
+    (name, netbox_id, ip_address, platform_name, site_name, role_name, device_type_name, message)"""
+    get = result.get
+    return (
+        get('name', ''),
+        get('netbox_id', ''),
+        get('ip_address', ''),
+        get('platform_name', ''),
+        get('site_name', ''),
+        get('role_name', ''),
+        get('device_type_name', ''),
+        get('message', '')
+    )
+
+
+def _track_widths(max_widths: List[int], row) -> None:
+    """Grow the running per-column text widths to fit a row of plain values"""
+    for i, value in enumerate(row):
+        length = len(str(value))
+        if length > max_widths[i]:
+            max_widths[i] = length
+
+
+def _scan_widths(rows: Iterator[list], max_widths: List[int]) -> List[list]:
+    """Take the first WIDTH_SCAN_LIMIT rows off the iterator, growing max_widths to fit them.
+
+    Only these rows are held; the caller appends them and then streams the rest of the iterator."""
+    head = list(islice(rows, WIDTH_SCAN_LIMIT))
+    for row in head:
+        _track_widths(max_widths, row)
+    return head
+
+
+def _set_column_widths(xl: SimpleNamespace, ws, max_widths: List[int], cap: int) -> None:
+    """Apply tracked widths; write-only sheets need this before the first append"""
+    for i, width in enumerate(max_widths, 1):
+        ws.column_dimensions[xl.get_column_letter(i)].width = min(width + 2, cap)
 
 
 class ImportReportGenerator:
@@ -27,6 +122,10 @@ class ImportReportGenerator:
         self.netbox_data = {}
         self.topology_file = ""
         self.import_timestamp = None
+        self._ts_filename = ""
+        self._ts_display = ""
+        self._stats = None
+        self._rows = None
 
     def set_import_data(self, results: List[Dict], netbox_data: Dict, topology_file: str = ""):
         """Set the import results and supporting data"""
@@ -34,6 +133,28 @@ class ImportReportGenerator:
         self.netbox_data = netbox_data
         self.topology_file = topology_file
         self.import_timestamp = datetime.now()
+        self._ts_filename = self.import_timestamp.strftime("%Y%m%d_%H%M%S")
+        self._ts_display = self.import_timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        self._stats = None
+        self._rows = None
+
+    def _projected_rows(self) -> List[Tuple[bool, Tuple]]:
+        """Return (success, projected fields) per result, shared by the CSV and Excel reports"""
+        if self._rows is None:
+            self._rows = [(bool(r.get('success', False)), _project(r)) for r in self.import_results]
+        return self._rows
+
+    def _compute_stats(self) -> Tuple[int, int, Counter]:
+        """Return (successful, failed, platform_counts), computed in one pass and cached"""
+        if self._stats is None:
+            successful = 0
+            platform_counts = Counter()
+            for result in self.import_results:
+                if result.get('success', False):
+                    successful += 1
+                platform_counts[result.get('platform_name', 'Unknown')] += 1
+            self._stats = (successful, len(self.import_results) - successful, platform_counts)
+        return self._stats
 
     def generate_csv_report(self, parent_widget=None) -> bool:
         """Generate CSV report of import results"""
@@ -43,7 +164,7 @@ class ImportReportGenerator:
 
         # Get save location
         documents_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DocumentsLocation)
-        timestamp = self.import_timestamp.strftime("%Y%m%d_%H%M%S")
+        timestamp = self._ts_filename
         default_filename = f"netbox_import_report_{timestamp}.csv"
         default_path = str(Path(documents_dir) / default_filename)
 
@@ -58,46 +179,35 @@ class ImportReportGenerator:
             return False
 
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+            with open(file_path, 'w', newline='', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE) as csvfile:
                 writer = csv.writer(csvfile)
 
-                # Write header information
-                writer.writerow(['NetBox Import Report'])
-                writer.writerow(['Generated:', self.import_timestamp.strftime("%Y-%m-%d %H:%M:%S")])
-                writer.writerow(['Topology File:', self.topology_file or 'Unknown'])
-                writer.writerow([])  # Empty row
-
-                # Write summary
-                successful = len([r for r in self.import_results if r.get('success', False)])
-                failed = len(self.import_results) - successful
-
-                writer.writerow(['Import Summary'])
-                writer.writerow(['Total Devices Processed:', len(self.import_results)])
-                writer.writerow(['Successfully Created:', successful])
-                writer.writerow(['Failed to Create:', failed])
-                writer.writerow(['Success Rate:',
-                                 f"{(successful / len(self.import_results) * 100):.1f}%" if self.import_results else "0%"])
-                writer.writerow([])  # Empty row
-
-                # Write detailed results
-                writer.writerow([
-                    'Device Name', 'Status', 'NetBox ID', 'IP Address', 'Platform',
-                    'Site', 'Role', 'Device Type', 'Message', 'Admin Notes'
+                successful, failed, _ = self._compute_stats()
+                total = len(self.import_results)
+
+                # Header information, summary and detail column headers in one batch
+                writer.writerows([
+                    ['NetBox Import Report'],
+                    ['Generated:', self._ts_display],
+                    ['Topology File:', self.topology_file or 'Unknown'],
+                    [],  # Empty row
+                    ['Import Summary'],
+                    ['Total Devices Processed:', total],
+                    ['Successfully Created:', successful],
+                    ['Failed to Create:', failed],
+                    ['Success Rate:', f"{(successful / total * 100):.1f}%" if total else "0%"],
+                    [],  # Empty row
+                    [
+                        'Device Name', 'Status', 'NetBox ID', 'IP Address', 'Platform',
+                        'Site', 'Role', 'Device Type', 'Message', 'Admin Notes'
+                    ],
                 ])
 
-                for result in self.import_results:
-                    writer.writerow([
-                        result.get('name', ''),
-                        'SUCCESS' if result.get('success', False) else 'FAILED',
-                        result.get('netbox_id', ''),
-                        result.get('ip_address', ''),
-                        result.get('platform_name', ''),
-                        result.get('site_name', ''),
-                        result.get('role_name', ''),
-                        result.get('device_type_name', ''),
-                        result.get('message', ''),
-                        ''  # Empty admin notes column for manual entry
-                    ])
+                # Write detailed results, with an empty admin notes column for manual entry
+                writer.writerows([
+                    (fields[0], 'SUCCESS' if is_success else 'FAILED', *fields[1:], '')
+                    for is_success, fields in self._projected_rows()
+                ])
 
             QMessageBox.information(
                 parent_widget,
@@ -112,7 +222,8 @@ class ImportReportGenerator:
 
     def generate_excel_report(self, parent_widget=None) -> bool:
         """Generate comprehensive Excel report with admin follow-up template"""
-        if not EXCEL_AVAILABLE:
+        xl = _load_openpyxl()
+        if xl is None:
             QMessageBox.warning(
                 parent_widget,
                 "Excel Not Available",
@@ -126,7 +237,7 @@ class ImportReportGenerator:
 
         # Get save location
         documents_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DocumentsLocation)
-        timestamp = self.import_timestamp.strftime("%Y%m%d_%H%M%S")
+        timestamp = self._ts_filename
         default_filename = f"netbox_import_admin_report_{timestamp}.xlsx"
         default_path = str(Path(documents_dir) / default_filename)
 
@@ -141,16 +252,17 @@ class ImportReportGenerator:
             return False
 
         try:
-            workbook = openpyxl.Workbook()
+            # Write-only mode streams rows out instead of keeping every cell in memory
+            workbook = xl.Workbook(write_only=True)
 
             # Create summary worksheet
-            self._create_summary_sheet(workbook)
+            self._create_summary_sheet(xl, workbook)
 
             # Create detailed results worksheet
-            self._create_details_sheet(workbook)
+            self._create_details_sheet(xl, workbook)
 
             # Create admin follow-up worksheet
-            self._create_admin_template_sheet(workbook)
+            self._create_admin_template_sheet(xl, workbook)
 
             # Save workbook
             workbook.save(file_path)
@@ -166,56 +278,37 @@ class ImportReportGenerator:
             QMessageBox.critical(parent_widget, "Report Error", f"Failed to generate Excel report:\n{str(e)}")
             return False
 
-    def _create_summary_sheet(self, workbook):
+    def _create_summary_sheet(self, xl: SimpleNamespace, workbook):
         """Create summary worksheet"""
-        ws = workbook.active
-        ws.title = "Import Summary"
-
-        # Header styling
-        header_font = Font(bold=True, size=14)
-
-        # Title
-        ws['A1'] = "NetBox Import Report"
-        ws['A1'].font = Font(bold=True, size=16)
-
-        # Basic info
-        ws['A3'] = "Import Date:"
-        ws['B3'] = self.import_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        ws['A4'] = "Topology File:"
-        ws['B4'] = self.topology_file or 'Unknown'
+        ws = workbook.create_sheet("Import Summary")
+        ws.column_dimensions['A'].width = 25
+        ws.column_dimensions['B'].width = 25
 
         # Summary statistics
-        successful = len([r for r in self.import_results if r.get('success', False)])
-        failed = len(self.import_results) - successful
-
-        ws['A6'] = "Summary Statistics"
-        ws['A6'].font = header_font
-
-        ws['A7'] = "Total Devices:"
-        ws['B7'] = len(self.import_results)
-        ws['A8'] = "Successfully Created:"
-        ws['B8'] = successful
-        ws['A9'] = "Failed:"
-        ws['B9'] = failed
-        ws['A10'] = "Success Rate:"
-        ws['B10'] = f"{(successful / len(self.import_results) * 100):.1f}%" if self.import_results else "0%"
+        successful, failed, platform_counts = self._compute_stats()
+
+        # Title and basic info
+        ws.append([_styled_cell(xl, ws, "NetBox Import Report", xl.title_font)])
+        ws.append([])
+        ws.append(["Import Date:", self._ts_display])
+        ws.append(["Topology File:", self.topology_file or 'Unknown'])
+        ws.append([])
+
+        ws.append([_styled_cell(xl, ws, "Summary Statistics", xl.section_font)])
+        ws.append(["Total Devices:", len(self.import_results)])
+        ws.append(["Successfully Created:", successful])
+        ws.append(["Failed:", failed])
+        ws.append(["Success Rate:",
+                   f"{(successful / len(self.import_results) * 100):.1f}%" if self.import_results else "0%"])
+        ws.append([])
 
         # Platform breakdown
-        platform_counts = {}
-        for result in self.import_results:
-            platform = result.get('platform_name', 'Unknown')
-            platform_counts[platform] = platform_counts.get(platform, 0) + 1
+        ws.append([_styled_cell(xl, ws, "Platform Breakdown", xl.section_font)])
 
-        ws['A12'] = "Platform Breakdown"
-        ws['A12'].font = header_font
-
-        row = 13
         for platform, count in sorted(platform_counts.items()):
-            ws[f'A{row}'] = platform
-            ws[f'B{row}'] = count
-            row += 1
+            ws.append([platform, count])
 
-    def _create_details_sheet(self, workbook):
+    def _create_details_sheet(self, xl: SimpleNamespace, workbook):
         """Create detailed results worksheet"""
         ws = workbook.create_sheet("Import Details")
 
@@ -225,93 +318,69 @@ class ImportReportGenerator:
             'Site', 'Role', 'Device Type', 'Import Message'
         ]
 
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-
-        # Data rows
-        for row, result in enumerate(self.import_results, 2):
-            ws.cell(row=row, column=1, value=result.get('name', ''))
-            ws.cell(row=row, column=2, value='SUCCESS' if result.get('success', False) else 'FAILED')
-            ws.cell(row=row, column=3, value=result.get('netbox_id', ''))
-            ws.cell(row=row, column=4, value=result.get('ip_address', ''))
-            ws.cell(row=row, column=5, value=result.get('platform_name', ''))
-            ws.cell(row=row, column=6, value=result.get('site_name', ''))
-            ws.cell(row=row, column=7, value=result.get('role_name', ''))
-            ws.cell(row=row, column=8, value=result.get('device_type_name', ''))
-            ws.cell(row=row, column=9, value=result.get('message', ''))
-
-            # Color code status
-            status_cell = ws.cell(row=row, column=2)
-            if result.get('success', False):
-                status_cell.fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-            else:
-                status_cell.fill = PatternFill(start_color="FFB6C1", end_color="FFB6C1", fill_type="solid")
-
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-    def _create_admin_template_sheet(self, workbook):
+        # Color coded status cells, shared by every data row
+        success_cell = _styled_cell(xl, ws, 'SUCCESS', fill=xl.fill_success)
+        failed_cell = _styled_cell(xl, ws, 'FAILED', fill=xl.fill_fail)
+
+        # Fit the column widths to the leading rows, which must be set before the first append
+        rows = ([fields[0], 'SUCCESS' if is_success else 'FAILED', *fields[1:]]
+                for is_success, fields in self._projected_rows())
+        max_widths = [len(h) for h in headers]
+        head = _scan_widths(rows, max_widths)
+
+        _set_column_widths(xl, ws, max_widths, 50)
+
+        ws.append([_styled_cell(xl, ws, header, xl.header_font, xl.header_fill_blue) for header in headers])
+
+        # Data rows: the scanned ones, then the rest straight from the iterator
+        for row in chain(head, rows):
+            row[1] = success_cell if row[1] == 'SUCCESS' else failed_cell
+            ws.append(row)
+
+    def _create_admin_template_sheet(self, xl: SimpleNamespace, workbook):
         """Create admin follow-up template worksheet"""
         ws = workbook.create_sheet("Admin Follow-up")
 
-        # Instructions
-        ws['A1'] = "NetBox Administrative Follow-up Template"
-        ws['A1'].font = Font(bold=True, size=14)
-
-        ws['A3'] = "Instructions:"
-        ws['A4'] = "1. Complete the missing information for successfully imported devices"
-        ws['A5'] = "2. Assign devices to racks and locations as needed"
-        ws['A6'] = "3. Add asset tags, serial numbers, and custom field values"
-        ws['A7'] = "4. Configure device relationships and connections"
-        ws['A8'] = ""
+        title = "NetBox Administrative Follow-up Template"
+        instructions = [
+            "Instructions:",
+            "1. Complete the missing information for successfully imported devices",
+            "2. Assign devices to racks and locations as needed",
+            "3. Add asset tags, serial numbers, and custom field values",
+            "4. Configure device relationships and connections",
+        ]
 
-        # Headers for follow-up table
+        # Headers for follow-up table (row 10)
         headers = [
             'Device Name', 'NetBox ID', 'Status', 'Rack Assignment', 'Position',
             'Asset Tag', 'Serial Number', 'Location', 'Custom Fields', 'Notes'
         ]
 
-        start_row = 10
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=start_row, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="FFA500", end_color="FFA500", fill_type="solid")
-
-        # Add successful devices for follow-up
-        successful_devices = [r for r in self.import_results if r.get('success', False)]
-
-        for row, result in enumerate(successful_devices, start_row + 1):
-            ws.cell(row=row, column=1, value=result.get('name', ''))
-            ws.cell(row=row, column=2, value=result.get('netbox_id', ''))
-            ws.cell(row=row, column=3, value='Imported - Needs Configuration')
-            # Columns 4-10 left blank for admin input
-
-            # Light yellow background for data entry rows
-            for col in range(4, 11):
-                cell = ws.cell(row=row, column=col)
-                cell.fill = PatternFill(start_color="FFFACD", end_color="FFFACD", fill_type="solid")
-
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 30)
-            ws.column_dimensions[column_letter].width = adjusted_width
\ No newline at end of file
+        max_widths = [len(h) for h in headers]
+        max_widths[0] = max([max_widths[0], len(title)] + [len(line) for line in instructions])
+
+        # Successful devices for follow-up; widths come from the leading rows only
+        rows = ([fields[0], fields[1], 'Imported - Needs Configuration']
+                for is_success, fields in self._projected_rows() if is_success)
+        head = _scan_widths(rows, max_widths)
+
+        _set_column_widths(xl, ws, max_widths, 30)
+
+        # Instructions
+        ws.append([_styled_cell(xl, ws, title, xl.section_font)])
+        ws.append([])
+
+        for line in instructions:
+            ws.append([line])
+        ws.append([])
+        ws.append([])
+
+        ws.append([_styled_cell(xl, ws, header, xl.header_font, xl.header_fill_orange) for header in headers])
+
+        # Light yellow background for data entry columns 4-10, left blank for admin input;
+        # the same seven cells are reused for every row
+        entry_cells = [_styled_cell(xl, ws, None, fill=xl.fill_admin_entry) for _ in range(4, 11)]
+
+        for row_cells in chain(head, rows):
+            row_cells.extend(entry_cells)
+            ws.append(row_cells)
@@ -10,9 +10,10 @@ from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
     QWidget, QPushButton, QLabel, QTabWidget, QGroupBox,
     QProgressBar, QCheckBox, QFileDialog, QMessageBox,
-    QLineEdit, QTextEdit, QComboBox, QFormLayout, QDialog
+    QLineEdit, QTextEdit, QPlainTextEdit, QComboBox, QFormLayout, QDialog
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, QSignalBlocker
+from PyQt6.QtGui import QTextCursor
 
 # Import our modularized components
 from config_manager import (
@@ -24,7 +25,7 @@ from threading_classes import (
     NetBoxDataThread, DeviceImportThread
 )
 from netbox_api import NetBoxAPI, DeviceDiscoveryModel
-from ui_components import DeviceTableWidget, get_table_selection_count
+from ui_components import DeviceTableWidget, build_combo_model, COL_PLATFORM, COL_SITE, COL_ROLE
 
 # Import new export and reporting functionality
 from export_utils import export_device_table_to_csv, get_device_table_summary
@@ -33,6 +34,10 @@ from import_report import ImportReportGenerator
 # Disable SSL warnings for self-signed certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Import log line openers, built once rather than per created device
+_LOG_OK_PREFIX = '<span style="color: green;">✓ '
+_LOG_FAIL_PREFIX = '<span style="color: red;">✗ '
+
 
 class NetBoxImportWizard(QMainWindow):
     """Main NetBox Import Wizard Application"""
@@ -45,11 +50,26 @@ class NetBoxImportWizard(QMainWindow):
         self.discovery_model = DeviceDiscoveryModel()
         self.netbox_data = {}
         self.devices_to_import = []
+        # Topology and existing-device objects the device table was last matched against
+        self._match_inputs = None
+        # Bumped for every NetBox data fetch; results from older fetches are dropped
+        self._fetch_gen = 0
+        self.netbox_data_thread = None
+        self.import_thread = None
 
         # Initialize export and reporting
         self.report_generator = ImportReportGenerator()
         self.import_results = []  # Store detailed import results
 
+        # Import progress and log lines are buffered and painted together on a short timer,
+        # so the UI repaints at a fixed rate however fast the import thread reports
+        self._pending_import_log = []
+        self._pending_import_progress = None
+        self._import_ui_timer = QTimer(self)
+        self._import_ui_timer.setSingleShot(True)
+        self._import_ui_timer.setInterval(100)
+        self._import_ui_timer.timeout.connect(self.flush_import_updates)
+
         # Initialize configuration
         self.config = ConfigManager()
 
@@ -93,7 +113,7 @@ class NetBoxImportWizard(QMainWindow):
         # Connection dropdown
         self.connection_combo = QComboBox()
         self.connection_combo.addItem("-- New Connection --", None)
-        self.connection_combo.currentTextChanged.connect(self.on_connection_selected)
+        self.connection_combo.currentIndexChanged.connect(self.on_connection_index_changed)
         connection_layout.addRow("Saved Connections:", self.connection_combo)
 
         self.url_input = QLineEdit()
@@ -255,6 +275,11 @@ class NetBoxImportWizard(QMainWindow):
         self.populate_dropdowns_btn.clicked.connect(self.refresh_netbox_data)
         controls_layout.addWidget(self.populate_dropdowns_btn)
 
+        self.refresh_reference_btn = QPushButton("Refresh Reference Data")
+        self.refresh_reference_btn.setToolTip("Also refetch sites, roles, platforms and device types")
+        self.refresh_reference_btn.clicked.connect(self.refresh_reference_data)
+        controls_layout.addWidget(self.refresh_reference_btn)
+
         self.auto_map_platforms_btn = QPushButton("Auto-Map Platforms")
         self.auto_map_platforms_btn.clicked.connect(self.auto_map_all_platforms)
         controls_layout.addWidget(self.auto_map_platforms_btn)
@@ -343,7 +368,10 @@ class NetBoxImportWizard(QMainWindow):
         log_group = QGroupBox("Import Log")
         log_layout = QVBoxLayout(log_group)
 
-        self.import_log = QTextEdit()
+        # Plain-text log: appends are laid out incrementally, and old lines are dropped past the cap
+        self.import_log = QPlainTextEdit()
+        self.import_log.setMaximumBlockCount(10000)
+        self.import_log.setUndoRedoEnabled(False)  # read-only log; no undo history to grow
         log_layout.addWidget(self.import_log)
 
         layout.addWidget(log_group)
@@ -389,33 +417,31 @@ class NetBoxImportWizard(QMainWindow):
 
     def populate_connection_dropdown(self):
         """Populate the connection dropdown with saved connections"""
-        self.connection_combo.clear()
-        self.connection_combo.addItem("-- New Connection --", None)
+        connections = self.config.list_connections() if self.config.is_credentials_unlocked() else []
+        model = build_combo_model(connections, "-- New Connection --", parent=self.connection_combo,
+                                  value=lambda conn: conn)
 
-        if self.config.is_credentials_unlocked():
-            for conn in self.config.list_connections():
-                self.connection_combo.addItem(conn.name, conn)
+        # Swap the whole model in silently; the fields the user just saved stay as they are
+        with QSignalBlocker(self.connection_combo):
+            self.connection_combo.setModel(model)
+            self.connection_combo.setCurrentIndex(0)
 
-    def on_connection_selected(self, connection_name: str):
+    def on_connection_index_changed(self, index: int):
         """Handle connection selection from dropdown"""
-        if connection_name == "-- New Connection --":
+        selected_conn = self.connection_combo.itemData(index)
+
+        # "-- New Connection --" carries no connection data
+        if selected_conn is None:
             self.clear_connection_fields()
             return
 
-        selected_conn = None
-        for i in range(self.connection_combo.count()):
-            if self.connection_combo.itemText(i) == connection_name:
-                selected_conn = self.connection_combo.itemData(i)
-                break
-
-        if selected_conn:
-            self.url_input.setText(selected_conn.url)
-            self.verify_ssl_checkbox.setChecked(selected_conn.verify_ssl)
-            self.connection_name_input.setText(selected_conn.name)
+        self.url_input.setText(selected_conn.url)
+        self.verify_ssl_checkbox.setChecked(selected_conn.verify_ssl)
+        self.connection_name_input.setText(selected_conn.name)
 
-            token = self.config.get_connection_token(selected_conn.name)
-            if token:
-                self.token_input.setText(token)
+        token = self.config.get_connection_token(selected_conn.name)
+        if token:
+            self.token_input.setText(token)
 
     def clear_connection_fields(self):
         """Clear connection input fields"""
@@ -424,15 +450,12 @@ class NetBoxImportWizard(QMainWindow):
         self.verify_ssl_checkbox.setChecked(False)
         self.connection_name_input.clear()
 
-    def save_current_connection(self):
-        """Save the current connection using config manager"""
+    def save_current_connection(self, url: str, token: str, verify_ssl: bool):
+        """Save the tested connection using config manager"""
         if not self.save_connection_checkbox.isChecked():
             return
 
         name = self.connection_name_input.text().strip()
-        url = self.url_input.text().strip()
-        token = self.token_input.text().strip()
-        verify_ssl = self.verify_ssl_checkbox.isChecked()
 
         if url and token:
             success = self.config.save_connection_if_enabled(
@@ -475,12 +498,11 @@ class NetBoxImportWizard(QMainWindow):
             self.connection_status.setStyleSheet("color: green")
             self.load_file_btn.setEnabled(True)
 
-            url = self.url_input.text().strip()
-            token = self.token_input.text().strip()
-            verify_ssl = self.verify_ssl_checkbox.isChecked()
-            self.netbox_api = NetBoxAPI(url, token, verify_ssl)
+            # Use the values that were actually tested; the fields may have been edited since
+            thread = self.connection_thread
+            self.netbox_api = NetBoxAPI(thread.url, thread.token, thread.verify_ssl, session=thread.session)
 
-            self.save_current_connection()
+            self.save_current_connection(thread.url, thread.token, thread.verify_ssl)
         else:
             self.connection_status.setText(f"✗ {message}")
             self.connection_status.setStyleSheet("color: red")
@@ -488,11 +510,11 @@ class NetBoxImportWizard(QMainWindow):
 
     def browse_topology_file(self):
         """Browse for topology JSON file"""
-        preferences = self.config.get_preferences()
-        start_dir = str(preferences.last_file_path) if preferences.last_file_path else ""
+        start_dir = self.config.get_preferences().last_file_path  # already a str, "" when unset
 
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select SecureCartography JSON file", start_dir, "JSON files (*.json)"
+            self, "Select SecureCartography JSON file", start_dir, "JSON files (*.json)",
+            options=QFileDialog.Option.ReadOnly
         )
         if file_path:
             self.file_path_input.setText(file_path)
@@ -522,13 +544,22 @@ class NetBoxImportWizard(QMainWindow):
 
     def on_topology_loaded(self, discovered_devices: Dict):
         """Handle successful topology loading"""
-        self.file_progress.setVisible(False)
-        self.load_file_btn.setEnabled(True)
-
         self.discovery_model.set_discovered_devices(discovered_devices)
+        self.statusBar().showMessage(f"Loaded {len(discovered_devices)} devices")
+
+        if not self.netbox_api:
+            self.show_discovery_tab()
+            return
+
+        # Stay on this tab until the device table is filled, so it is laid out and painted once
+        self.file_progress.setRange(0, 0)  # busy indicator
         self.start_netbox_data_fetch()
+
+    def show_discovery_tab(self):
+        """Finish the topology load and switch to the device discovery tab"""
+        self.file_progress.setVisible(False)
+        self.load_file_btn.setEnabled(True)
         self.tab_widget.setCurrentIndex(1)
-        self.statusBar().showMessage(f"Loaded {len(discovered_devices)} devices")
 
     def on_topology_error(self, error_message: str):
         """Handle topology loading error"""
@@ -546,19 +577,39 @@ class NetBoxImportWizard(QMainWindow):
         self.discovery_progress.setVisible(True)
         self.discovery_progress.setRange(0, 100)
 
-        self.netbox_data_thread = NetBoxDataThread(self.netbox_api)
-        self.netbox_data_thread.data_ready.connect(self.on_netbox_data_ready)
-        self.netbox_data_thread.data_error.connect(self.on_netbox_data_error)
+        # Supersede a fetch still in flight: stop it early, ignore what it still reports, and
+        # let the window own it until it finishes so it is not destroyed while running
+        previous = self.netbox_data_thread
+        if previous is not None and previous.isRunning():
+            previous.requestInterruption()
+            previous.progress_update.disconnect()
+            previous.setParent(self)
+            previous.finished.connect(previous.deleteLater)
+
+        self._fetch_gen += 1
+        self.netbox_data_thread = NetBoxDataThread(self.netbox_api, self._fetch_gen, self.discovery_model)
+        self.netbox_data_thread.data_ready.connect(self.on_netbox_fetch_ready)
+        self.netbox_data_thread.data_error.connect(self.on_netbox_fetch_error)
         self.netbox_data_thread.progress_update.connect(self.on_netbox_data_progress)
         self.netbox_data_thread.start()
 
+    def on_netbox_fetch_ready(self, generation: int, netbox_data: Dict, potential_matches: Dict):
+        """Accept data from the latest NetBox fetch only"""
+        if generation == self._fetch_gen:
+            self.on_netbox_data_ready(netbox_data, potential_matches)
+
+    def on_netbox_fetch_error(self, generation: int, error_message: str):
+        """Report errors from the latest NetBox fetch only"""
+        if generation == self._fetch_gen:
+            self.on_netbox_data_error(error_message)
+
     def on_netbox_data_progress(self, message: str, percentage: int):
         """Handle NetBox data fetch progress"""
         self.discovery_progress.setValue(percentage)
         self.statusBar().showMessage(message)
 
-    def on_netbox_data_ready(self, netbox_data: Dict):
-        """Handle successful NetBox data fetch"""
+    def on_netbox_data_ready(self, netbox_data: Dict, potential_matches: Optional[Dict] = None):
+        """Handle successful NetBox data fetch; matches are computed here unless the fetch thread did"""
         self.discovery_progress.setVisible(False)
         self.netbox_data = netbox_data
 
@@ -566,9 +617,10 @@ class NetBoxImportWizard(QMainWindow):
         self.table_progress_label.setVisible(True)
         self.table_progress.setValue(0)
 
-        potential_matches = self.discovery_model.find_potential_matches(
-            netbox_data.get('existing_devices', [])
-        )
+        existing_devices = netbox_data.get('existing_devices', [])
+        self._match_inputs = (self.discovery_model.discovered_devices, existing_devices)
+        if potential_matches is None:
+            potential_matches = self.discovery_model.find_potential_matches(existing_devices)
 
         self.device_table.populate_devices_with_netbox_data(
             self.discovery_model.discovered_devices,
@@ -579,6 +631,7 @@ class NetBoxImportWizard(QMainWindow):
     def on_netbox_data_error(self, error_message: str):
         """Handle NetBox data fetch error"""
         self.discovery_progress.setVisible(False)
+        self.show_discovery_tab()
         QMessageBox.warning(self, "Warning", f"Failed to fetch NetBox data: {error_message}")
         self.statusBar().showMessage("Error fetching NetBox data")
 
@@ -601,6 +654,7 @@ class NetBoxImportWizard(QMainWindow):
         self.export_btn.setEnabled(True)
         self.export_summary_btn.setEnabled(True)
 
+        self.show_discovery_tab()
         self.statusBar().showMessage("NetBox data loaded successfully")
 
     # Device Management Methods
@@ -609,36 +663,20 @@ class NetBoxImportWizard(QMainWindow):
         if not self.netbox_data:
             return
 
-        # Populate discovered platform filter
-        discovered_platforms = set()
-        for row in range(self.device_table.rowCount()):
-            platform_item = self.device_table.item(row, 3)
-            if platform_item and platform_item.text().strip():
-                discovered_platforms.add(platform_item.text().strip())
-
-        self.discovered_platform_combo.clear()
-        self.discovered_platform_combo.addItem("-- Select Platform --")
-        for platform in sorted(discovered_platforms):
-            self.discovered_platform_combo.addItem(platform)
-
-        # Populate default combos
-        sites = self.netbox_data.get('sites', [])
-        self.default_site_combo.clear()
-        self.default_site_combo.addItem("-- Site --", None)
-        for site in sites:
-            self.default_site_combo.addItem(site.name, site.id)
-
-        roles = self.netbox_data.get('roles', [])
-        self.default_role_combo.clear()
-        self.default_role_combo.addItem("-- Role --", None)
-        for role in roles:
-            self.default_role_combo.addItem(role.name, role.id)
-
-        platforms = self.netbox_data.get('platforms', [])
-        self.default_platform_combo.clear()
-        self.default_platform_combo.addItem("-- Platform --", None)
-        for platform in platforms:
-            self.default_platform_combo.addItem(platform.name, platform.id)
+        # Populate discovered platform filter from the set the model computed on load
+        with QSignalBlocker(self.discovered_platform_combo):
+            self.discovered_platform_combo.clear()
+            self.discovered_platform_combo.addItems(
+                ["-- Select Platform --"] + self.discovery_model.extract_unique_platforms())
+
+        # Default combos share the table's dropdown models, so each NetBox list is held only once
+        for combo, column in ((self.default_site_combo, COL_SITE),
+                              (self.default_role_combo, COL_ROLE),
+                              (self.default_platform_combo, COL_PLATFORM)):
+            model = self.device_table.combo_model(column)
+            if model is not None:
+                combo.setModel(model)
+                combo.setCurrentIndex(0)
 
     def select_by_discovered_platform(self):
         """Select all devices of the chosen discovered platform"""
@@ -670,32 +708,7 @@ class NetBoxImportWizard(QMainWindow):
 
     def auto_map_all_platforms(self):
         """Auto-map platforms for all devices in the table"""
-        platforms = self.netbox_data.get('platforms', [])
-        mapped_count = 0
-
-        for row in range(self.device_table.rowCount()):
-            discovered_item = self.device_table.item(row, 3)
-            if not discovered_item:
-                continue
-
-            discovered_platform = discovered_item.text()
-            if not discovered_platform:
-                continue
-
-            platform_combo = self.device_table.cellWidget(row, 4)
-            if not platform_combo:
-                continue
-
-            if platform_combo.currentData() is not None:
-                continue
-
-            matched_platform = self.device_table._find_matching_platform(discovered_platform, platforms)
-            if matched_platform:
-                for i in range(platform_combo.count()):
-                    if platform_combo.itemData(i) == matched_platform.id:
-                        platform_combo.setCurrentIndex(i)
-                        mapped_count += 1
-                        break
+        mapped_count = self.device_table.auto_map_platforms()
 
         if mapped_count > 0:
             QMessageBox.information(self, "Auto-Mapping Complete",
@@ -706,24 +719,42 @@ class NetBoxImportWizard(QMainWindow):
 
     def update_selection_count(self):
         """Update the selection count display"""
-        count = get_table_selection_count(self.device_table)
+        count = len(self.device_table.selected_rows)
         self.selection_status.setText(f"{count} devices selected for import")
 
     def refresh_netbox_data(self):
-        """Manually refresh NetBox data"""
+        """Manually refresh NetBox data; only the existing device list is refetched"""
         if not self.netbox_api:
             QMessageBox.warning(self, "Warning", "Not connected to NetBox")
             return
 
-        self.netbox_api._cache = {}
+        self.netbox_api.invalidate('existing_devices')
+        self.start_netbox_data_fetch()
+
+    def refresh_reference_data(self):
+        """Refetch all NetBox data, including the rarely changing sites, roles, platforms and types"""
+        if not self.netbox_api:
+            QMessageBox.warning(self, "Warning", "Not connected to NetBox")
+            return
+
+        self.netbox_api.clear_cache()
         self.start_netbox_data_fetch()
 
     def refresh_device_matches(self):
         """Refresh device matches against NetBox"""
         if not self.netbox_data:
             self.start_netbox_data_fetch()
-        else:
-            self.on_netbox_data_ready(self.netbox_data)
+            return
+
+        # Matching and repopulating again against the very same objects would give the same table
+        if self._match_inputs is not None:
+            discovered, existing = self._match_inputs
+            if (discovered is self.discovery_model.discovered_devices and
+                    existing is self.netbox_data.get('existing_devices', [])):
+                self.statusBar().showMessage("Device matches are already up to date")
+                return
+
+        self.on_netbox_data_ready(self.netbox_data)
 
     # Export Methods
     def export_device_list(self):
@@ -775,16 +806,20 @@ Ready for Import: {summary['selected'] if summary['configured'] == summary['sele
         """Validate import configuration"""
         devices_to_import = self.device_table.get_selected_devices_for_import()
         validation_errors = []
+        add_error = validation_errors.append
 
+        # Rows come straight from the table model; only unset ids need any per-row work
         for device in devices_to_import:
+            if device['site_id'] and device['role_id'] and device['type_id']:
+                continue
             device_name = device['name']
 
             if not device['site_id']:
-                validation_errors.append(f"{device_name}: Site not selected")
+                add_error(f"{device_name}: Site not selected")
             if not device['role_id']:
-                validation_errors.append(f"{device_name}: Role not selected")
+                add_error(f"{device_name}: Role not selected")
             if not device['type_id']:
-                validation_errors.append(f"{device_name}: Device type not selected")
+                add_error(f"{device_name}: Device type not selected")
 
         if validation_errors:
             error_text = "\n".join(validation_errors)
@@ -817,33 +852,13 @@ Ready for Import: {summary['selected'] if summary['configured'] == summary['sele
         self.cancel_import_btn.setEnabled(True)
 
         self.import_log.clear()
-        self.import_log.append("Starting device import...\n")
-
-        # Get original device data with IP addresses for reporting
-        enhanced_import_data = []
-        for device in self.devices_to_import:
-            enhanced_device = device.copy()
-            # Find IP address from original discovery data
-            if device['name'] in self.discovery_model.discovered_devices:
-                node_details = self.discovery_model.discovered_devices[device['name']].get('node_details', {})
-                enhanced_device['ip_address'] = node_details.get('ip', '')
-            else:
-                # Check peers data
-                for device_name, device_data in self.discovery_model.discovered_devices.items():
-                    peers = device_data.get('peers', {})
-                    if device['name'] in peers:
-                        peer_data = peers[device['name']]
-                        enhanced_device['ip_address'] = peer_data.get('ip', '')
-                        break
-                else:
-                    enhanced_device['ip_address'] = ''
-            enhanced_import_data.append(enhanced_device)
+        self.import_log.appendPlainText("Starting device import...\n")
 
         # Set up report generator with current topology file
         topology_file = self.file_path_input.text()
         self.report_generator.set_import_data([], self.netbox_data, topology_file)
 
-        self.import_thread = DeviceImportThread(self.netbox_api, enhanced_import_data, self.netbox_data)
+        self.import_thread = DeviceImportThread(self.netbox_api, self.devices_to_import, self.netbox_data)
         self.import_thread.import_progress.connect(self.on_import_progress)
         self.import_thread.import_complete.connect(self.on_import_complete)
         self.import_thread.device_created.connect(self.on_device_created)
@@ -851,18 +866,39 @@ Ready for Import: {summary['selected'] if summary['configured'] == summary['sele
 
     def on_import_progress(self, device_name: str, current: int, total: int):
         """Handle import progress updates"""
-        self.import_progress.setValue(current)
-        self.statusBar().showMessage(f"Importing device {current}/{total}: {device_name}")
+        self._pending_import_progress = (device_name, current, total)
+        if not self._import_ui_timer.isActive():
+            self._import_ui_timer.start()
 
     def on_device_created(self, device_name: str, success: bool, message: str):
         """Handle individual device creation result"""
-        status = "✓" if success else "✗"
-        color = "green" if success else "red"
-        log_entry = f'<span style="color: {color};">{status} {device_name}: {message}</span><br>'
-        self.import_log.append(log_entry)
+        prefix = _LOG_OK_PREFIX if success else _LOG_FAIL_PREFIX
+        self._pending_import_log.append(f'{prefix}{device_name}: {message}</span>')
+        if not self._import_ui_timer.isActive():
+            self._import_ui_timer.start()
+
+    def flush_import_updates(self):
+        """Paint the latest buffered import progress and log lines"""
+        self._import_ui_timer.stop()
+
+        if self._pending_import_progress:
+            device_name, current, total = self._pending_import_progress
+            self._pending_import_progress = None
+            self.import_progress.setValue(current)
+            self.statusBar().showMessage(f"Importing device {current}/{total}: {device_name}")
+
+        if self._pending_import_log:
+            # One edit block, so the document is laid out once per flush rather than per line
+            cursor = QTextCursor(self.import_log.document())
+            cursor.beginEditBlock()
+            for log_entry in self._pending_import_log:
+                self.import_log.appendHtml(log_entry)
+            cursor.endEditBlock()
+            self._pending_import_log.clear()
 
     def on_import_complete(self, successful: int, failed: int, detailed_results: list = None):
         """Handle import completion with detailed results"""
+        self.flush_import_updates()
         self.import_btn.setEnabled(True)
         self.cancel_import_btn.setEnabled(False)
 
@@ -871,7 +907,7 @@ Ready for Import: {summary['selected'] if summary['configured'] == summary['sele
         if failed > 0:
             summary += f", {failed} failed"
 
-        self.import_log.append(f'<br><b>{summary}</b>')
+        self.import_log.appendHtml(f'<br><b>{summary}</b>')
         self.statusBar().showMessage(summary)
 
         # Store detailed results for reporting
@@ -887,9 +923,10 @@ Ready for Import: {summary['selected'] if summary['configured'] == summary['sele
 
     def cancel_import(self):
         """Cancel the running import"""
-        if hasattr(self, 'import_thread') and self.import_thread.isRunning():
+        if self.import_thread is not None and self.import_thread.isRunning():
             self.import_thread.requestInterruption()
-            self.import_log.append("<br><b>Import cancelled by user</b>")
+            self.flush_import_updates()
+            self.import_log.appendHtml("<br><b>Import cancelled by user</b>")
             self.import_btn.setEnabled(True)
             self.cancel_import_btn.setEnabled(False)
             self.statusBar().showMessage("Import cancelled")
@@ -901,6 +938,7 @@ Ready for Import: {summary['selected'] if summary['configured'] == summary['sele
                 window_width=self.width(),
                 window_height=self.height()
             )
+        self.config.flush()
         event.accept()
 
 
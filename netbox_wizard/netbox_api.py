@@ -1,86 +1,250 @@
 """
 NetBox API wrapper and utilities
 """
+import hashlib
+import json
+import logging
+import os
+from itertools import chain
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
 from typing import Dict, List, Optional
 import pynetbox
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# NetBox reference data is kept on disk between runs and refetched once it is older than this
+CACHE_DIR = Path.home() / ".cache" / "sc_netbox_importer"
+CACHE_TTL_SECONDS = 3600
+
+# Slack for clock differences with the NetBox server when checking for changes since a cache write
+CACHE_CLOCK_SKEW_SECONDS = 300
+
+# Discovered names per filtered existing-device request, keeping the query string a sane length
+DEVICE_NAME_CHUNK_SIZE = 100
+
+# Record attributes the wizard reads, per cached endpoint
+_CACHED_FIELDS = {
+    'manufacturers': ('id', 'name'),
+    'device_types': ('id', 'model', 'manufacturer'),
+    'device_roles': ('id', 'name'),
+    'platforms': ('id', 'name'),
+    'sites': ('id', 'name'),
+    'existing_devices': ('id', 'name', 'primary_ip4'),
+}
+
+
+def normalize_device_name(name: str) -> str:
+    """Key used to match discovered device names against NetBox device names"""
+    return name.strip().casefold()
+
+
+def create_netbox_session(verify_ssl: bool = False):
+    """Build a pooled HTTP session that can be shared by every NetBox call"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    if not verify_ssl:
+        session.verify = False
+
+    # Keep connections alive across requests, including concurrent fetches
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _record_to_dict(record, fields) -> Dict:
+    """Flatten the fields the wizard uses from a pynetbox record into plain JSON data"""
+    data = {}
+    for field in fields:
+        value = getattr(record, field, None)
+        if field == 'manufacturer':
+            value = {'id': getattr(value, 'id', None), 'name': getattr(value, 'name', None)} if value else None
+        elif field == 'primary_ip4':
+            value = str(value) if value else None
+        data[field] = value
+    return data
+
+
+def _dict_to_record(data: Dict) -> SimpleNamespace:
+    """Rehydrate cached data into an object with the same attribute access as a pynetbox record"""
+    manufacturer = data.get('manufacturer')
+    if manufacturer:
+        data = dict(data, manufacturer=SimpleNamespace(**manufacturer))
+    return SimpleNamespace(**data)
+
 
 class NetBoxAPI:
     """Wrapper for NetBox API operations"""
 
-    def __init__(self, url: str, token: str, verify_ssl: bool = False):
-        # Configure threading and SSL
-        import requests
-        session = requests.Session()
-        if not verify_ssl:
-            session.verify = False
+    def __init__(self, url: str, token: str, verify_ssl: bool = False, session=None):
+        # Reuse the connection test's session when given, so its pooled connections carry over
+        if session is None:
+            session = create_netbox_session(verify_ssl)
 
-        self.nb = pynetbox.api(url, token=token)
+        # threading=True lets pynetbox fetch the remaining pages of a listing concurrently once
+        # the first page reports the total count; the pooled session sizes for these requests
+        self.nb = pynetbox.api(url, token=token, threading=True)
         self.nb.http_session = session
+        # The fetch workers, the import thread and the UI thread all reach the cache; the lock
+        # guards the dict only and is never held across a NetBox request
         self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._cache_prefix = hashlib.sha1(url.rstrip('/').encode('utf-8')).hexdigest()[:16]
 
-    def get_manufacturers(self) -> List[Dict]:
-        if 'manufacturers' not in self._cache:
+    def _cache_file(self, cache_key: str) -> Path:
+        return CACHE_DIR / f"{self._cache_prefix}_{cache_key}.json"
+
+    def _load_disk_cache(self, cache_key: str, endpoint, filters: Dict) -> Optional[List]:
+        """Return cached records for this NetBox instance, or None if missing or out of date.
+
+        Past the TTL the cache is revalidated rather than dropped: if NetBox still has the same
+        number of objects and none were updated since the cache was written, it is kept."""
+        cache_file = self._cache_file(cache_key)
+        try:
+            cached_at = cache_file.stat().st_mtime
+            raw = cache_file.read_bytes()
+            records = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+        except (OSError, ValueError, TypeError):
+            return None
+
+        if time.time() - cached_at >= CACHE_TTL_SECONDS:
+            if not self._is_unchanged(endpoint, filters, len(records), cached_at):
+                return None
             try:
-                self._cache['manufacturers'] = list(self.nb.dcim.manufacturers.all())
-            except Exception as e:
-                print(f"Error fetching manufacturers: {e}")
-                self._cache['manufacturers'] = []
-        return self._cache['manufacturers']
+                os.utime(cache_file)
+            except OSError:
+                pass
 
-    def get_device_types(self, manufacturer_id: Optional[int] = None) -> List[Dict]:
-        cache_key = f'device_types_{manufacturer_id}'
-        if cache_key not in self._cache:
+        return [_dict_to_record(data) for data in records]
+
+    def _is_unchanged(self, endpoint, filters: Dict, cached_count: int, cached_at: float) -> bool:
+        """Check with two count queries whether an endpoint changed since cached_at"""
+        since = datetime.fromtimestamp(cached_at - CACHE_CLOCK_SKEW_SECONDS, tz=timezone.utc).isoformat()
+        try:
+            return (endpoint.count(**filters) == cached_count and
+                    endpoint.count(last_updated__gte=since, **filters) == 0)
+        except Exception as e:
+            print(f"Error revalidating NetBox cache: {e}")
+            return False
+
+    def _save_disk_cache(self, cache_key: str, data: List[Dict]) -> None:
+        cache_file = self._cache_file(cache_key)
+        try:
+            payload = orjson.dumps(data) if ORJSON_AVAILABLE else json.dumps(data).encode('utf-8')
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix('.tmp')
+            tmp_file.write_bytes(payload)
+            os.replace(tmp_file, cache_file)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing NetBox cache {cache_file}: {e}")
+
+    def invalidate(self, *names: str):
+        """Drop the cached data of the named endpoints only (e.g. 'existing_devices'), in memory and on disk.
+
+        A name also covers its filtered variants, so 'device_types' drops every manufacturer's list."""
+        for name in names:
+            with self._cache_lock:
+                for cache_key in [key for key in self._cache if key == name or key.startswith(f"{name}_")]:
+                    del self._cache[cache_key]
+            for cache_file in CACHE_DIR.glob(f"{self._cache_prefix}_{name}*.json"):
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    pass
+
+    def clear_cache(self):
+        """Drop the in-memory and on-disk cached NetBox data for this instance"""
+        with self._cache_lock:
+            self._cache.clear()
+        for cache_file in CACHE_DIR.glob(f"{self._cache_prefix}_*.json"):
             try:
-                if manufacturer_id:
-                    self._cache[cache_key] = list(self.nb.dcim.device_types.filter(manufacturer_id=manufacturer_id))
+                cache_file.unlink()
+            except OSError:
+                pass
+
+    def _get_cached(self, cache_key: str, fields_key: str, endpoint, label: str,
+                    filters: Optional[Dict] = None) -> List:
+        """Return records from memory, then the disk cache, then NetBox"""
+        filters = filters or {}
+        with self._cache_lock:
+            records = self._cache.get(cache_key)
+        if records is None:
+            records = self._load_disk_cache(cache_key, endpoint, filters)
+            if records is None:
+                # Keep only the listed fields of each record. With threading=True pynetbox still holds
+                # every raw page before yielding, so this bounds what stays cached, not peak fetch memory
+                fields = _CACHED_FIELDS[fields_key]
+                try:
+                    fetched = endpoint.filter(**filters) if filters else endpoint.all()
+                    data = [_record_to_dict(record, fields) for record in fetched]
+                except Exception as e:
+                    print(f"Error fetching {label}: {e}")
+                    records = []
                 else:
-                    self._cache[cache_key] = list(self.nb.dcim.device_types.all())
-            except Exception as e:
-                print(f"Error fetching device types: {e}")
-                self._cache[cache_key] = []
-        return self._cache[cache_key]
+                    self._save_disk_cache(cache_key, data)
+                    records = [_dict_to_record(item) for item in data]
+            with self._cache_lock:
+                records = self._cache.setdefault(cache_key, records)
+        return records
+
+    def get_manufacturers(self) -> List[Dict]:
+        return self._get_cached('manufacturers', 'manufacturers',
+                                self.nb.dcim.manufacturers, "manufacturers")
+
+    def get_device_types(self, manufacturer_id: Optional[int] = None) -> List[Dict]:
+        filters = {'manufacturer_id': manufacturer_id} if manufacturer_id else None
+        return self._get_cached(f'device_types_{manufacturer_id}', 'device_types',
+                                self.nb.dcim.device_types, "device types", filters)
 
     def get_device_roles(self) -> List[Dict]:
-        if 'device_roles' not in self._cache:
-            try:
-                self._cache['device_roles'] = list(self.nb.dcim.device_roles.all())
-            except Exception as e:
-                print(f"Error fetching device roles: {e}")
-                self._cache['device_roles'] = []
-        return self._cache['device_roles']
+        return self._get_cached('device_roles', 'device_roles',
+                                self.nb.dcim.device_roles, "device roles")
 
     def get_platforms(self) -> List[Dict]:
-        if 'platforms' not in self._cache:
-            try:
-                self._cache['platforms'] = list(self.nb.dcim.platforms.all())
-            except Exception as e:
-                print(f"Error fetching platforms: {e}")
-                self._cache['platforms'] = []
-        return self._cache['platforms']
+        return self._get_cached('platforms', 'platforms', self.nb.dcim.platforms, "platforms")
 
     def get_sites(self) -> List[Dict]:
-        if 'sites' not in self._cache:
-            try:
-                self._cache['sites'] = list(self.nb.dcim.sites.all())
-            except Exception as e:
-                print(f"Error fetching sites: {e}")
-                self._cache['sites'] = []
-        return self._cache['sites']
-
-    def get_existing_devices(self) -> List[Dict]:
-        if 'existing_devices' not in self._cache:
-            try:
-                self._cache['existing_devices'] = list(self.nb.dcim.devices.all())
-            except Exception as e:
-                print(f"Error fetching existing devices: {e}")
-                self._cache['existing_devices'] = []
-        return self._cache['existing_devices']
+        return self._get_cached('sites', 'sites', self.nb.dcim.sites, "sites")
+
+    def get_existing_devices(self, names=None) -> List[Dict]:
+        """Existing NetBox devices, or only those named like one of names (case-insensitive)"""
+        if names is None:
+            return self._get_cached('existing_devices', 'existing_devices',
+                                    self.nb.dcim.devices, "existing devices")
+
+        # One name per case variant, sorted so the same topology maps onto the same cached chunks
+        unique_names = {normalize_device_name(name): name.strip() for name in names if name and name.strip()}
+        names = sorted(unique_names.values())
+
+        devices = []
+        for start in range(0, len(names), DEVICE_NAME_CHUNK_SIZE):
+            chunk = names[start:start + DEVICE_NAME_CHUNK_SIZE]
+            digest = hashlib.sha1('\n'.join(chunk).encode('utf-8')).hexdigest()[:16]
+            devices.extend(self._get_cached(f'existing_devices_{digest}', 'existing_devices',
+                                            self.nb.dcim.devices, "existing devices", {'name__ie': chunk}))
+        return devices
 
     def create_device(self, device_data: Dict) -> Dict:
-        """Create a new device in NetBox"""
+        """Create a new device in NetBox; the caller invalidates 'existing_devices' afterwards"""
         return self.nb.dcim.devices.create(device_data)
 
+    def create_devices_bulk(self, devices_data: List[Dict]) -> List:
+        """Create several devices in NetBox with a single bulk POST; the caller invalidates 'existing_devices'"""
+        return self.nb.dcim.devices.create(devices_data)
+
     def create_cable(self, cable_data: Dict) -> Dict:
         """Create a cable connection in NetBox"""
         return self.nb.dcim.cables.create(cable_data)
@@ -93,84 +257,65 @@ class DeviceDiscoveryModel:
         self.discovered_devices = {}
         self.device_mappings = {}
         self.existing_devices = {}
+        self.discovered_platforms = frozenset()
 
     def set_discovered_devices(self, devices: Dict):
         """Set discovered devices from thread result"""
         self.discovered_devices = devices
+        self.discovered_platforms = self._collect_platforms()
+
+    def all_device_names(self) -> set:
+        """Names of every device that will appear in the table (main + peers)"""
+        all_device_names = set(self.discovered_devices)
+        for device_data in self.discovered_devices.values():
+            peers = device_data.get('peers', {})
+            if isinstance(peers, dict):
+                all_device_names.update(peers)
+        return all_device_names
 
     def find_potential_matches(self, netbox_devices: List[Dict]) -> Dict:
         """Find potential matches between discovered and existing NetBox devices"""
         matches = {}
 
-        # Get all device names that will appear in the table (main + peers)
-        all_device_names = set()
+        logger.debug("Starting with %d main devices", len(self.discovered_devices))
 
-        print(f"DEBUG: Starting with {len(self.discovered_devices)} main devices")
+        all_device_names = self.all_device_names()
 
-        # Add main devices
-        for device_name in self.discovered_devices.keys():
-            all_device_names.add(device_name)
-            print(f"DEBUG: Added main device: {device_name}")
+        logger.debug("Checking %d NetBox devices for matches", len(netbox_devices))
 
-        # Add peer devices
-        for device_name, device_data in self.discovered_devices.items():
-            peers = device_data.get('peers', {})
-            if isinstance(peers, dict):
-                print(f"DEBUG: Checking peers for {device_name}: {list(peers.keys())}")
-                for peer_name in peers.keys():
-                    if peer_name not in self.discovered_devices:  # Avoid duplicates
-                        all_device_names.add(peer_name)
-                        print(f"DEBUG: Added peer device: {peer_name}")
-                    else:
-                        print(f"DEBUG: Skipped peer {peer_name} (already a main device)")
-
-        print(f"DEBUG: All device names to check ({len(all_device_names)}): {sorted(all_device_names)}")
-        print(f"DEBUG: Checking {len(netbox_devices)} NetBox devices for matches")
+        # Index NetBox devices by normalized name once, so each lookup below is O(1)
+        devices_by_name = {}
+        for nb_device in netbox_devices:
+            # Only match by name (case-insensitive)
+            name = getattr(nb_device, 'name', None)
+            if name:
+                devices_by_name.setdefault(normalize_device_name(name), []).append(nb_device)
 
         for device_name in all_device_names:
-            print(f"DEBUG: Looking for matches for: '{device_name}'")
+            found = devices_by_name.get(normalize_device_name(device_name))
+            if found:
+                matches[device_name] = [('name', nb_device) for nb_device in found]
 
-            potential_matches = []
-            for nb_device in netbox_devices:
-                try:
-                    # Only match by name (case-insensitive)
-                    if hasattr(nb_device, 'name') and nb_device.name:
-                        if nb_device.name.lower() == device_name.lower():
-                            print(f"DEBUG: MATCH FOUND - '{device_name}' matches '{nb_device.name}'")
-                            potential_matches.append(('name', nb_device))
-                except (AttributeError, ValueError) as e:
-                    print(f"DEBUG: Error checking device: {e}")
-                    continue
-
-            if potential_matches:
-                matches[device_name] = potential_matches
-                print(f"DEBUG: Total matches for '{device_name}': {len(potential_matches)}")
-            else:
-                print(f"DEBUG: NO MATCHES found for '{device_name}'")
-
-        print(f"DEBUG: Final matches dict: {list(matches.keys())}")
+        logger.debug("Final matches: %s", matches.keys())
         return matches
 
 
     def extract_unique_platforms(self) -> List[str]:
         """Extract unique platform strings from discovered devices"""
-        platforms = set()
+        return sorted(self.discovered_platforms)
 
-        for device_name, device_data in self.discovered_devices.items():
-            # Get platform from node_details
-            node_details = device_data.get('node_details', {})
-            if isinstance(node_details, dict):
-                platform = node_details.get('platform', '')
-                if platform and platform.strip():
-                    platforms.add(platform.strip())
+    def _collect_platforms(self) -> frozenset:
+        """Collect the stripped platform strings of every discovered device and peer"""
+        devices = [d for d in self.discovered_devices.values() if isinstance(d, dict)]
 
-            # Also check peers for platforms
-            peers = device_data.get('peers', {})
-            if isinstance(peers, dict):
-                for peer_name, peer_data in peers.items():
-                    if isinstance(peer_data, dict):
-                        peer_platform = peer_data.get('platform', '')
-                        if peer_platform and peer_platform.strip():
-                            platforms.add(peer_platform.strip())
+        # Platforms from node_details, and from every peer entry
+        node_platforms = (d.get('node_details', {}) for d in devices)
+        peer_platforms = chain.from_iterable(
+            peers.values() for peers in (d.get('peers', {}) for d in devices) if isinstance(peers, dict)
+        )
 
-        return sorted(list(platforms))
+        return frozenset(
+            entry['platform'].strip()
+            for entry in chain(node_platforms, peer_platforms)
+            if isinstance(entry, dict) and isinstance(entry.get('platform'), str) and entry['platform'].strip()
+        )
@@ -2,9 +2,46 @@
 Threading classes for NetBox Import Wizard
 """
 import json
-from typing import Dict, List
+import os
+from sys import intern
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Dict, List, Optional
 from PyQt6.QtCore import QThread, pyqtSignal
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+
+    IJSON_AVAILABLE = True
+    IJSON_ERRORS = (ijson.JSONError,)
+except ImportError:
+    IJSON_AVAILABLE = False
+    IJSON_ERRORS = ()
+
+# Raised by both parsers when the file is valid JSON but not a mapping of devices
+TOPOLOGY_ROOT_ERROR = "Topology file must contain a JSON object of devices"
+
+# Per-item progress signals are throttled to roughly this many per run, since each
+# one is marshalled to the UI thread and repaints the progress widgets
+PROGRESS_UPDATES = 50
+
+# Worker threads for the concurrent NetBox fetches, created on first use and reused by every refresh
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_fetch_executor() -> ThreadPoolExecutor:
+    global _fetch_executor
+    if _fetch_executor is None:
+        _fetch_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="netbox-fetch")
+    return _fetch_executor
+
 
 class NetBoxConnectionThread(QThread):
     """Thread for testing NetBox connection without blocking UI"""
@@ -16,25 +53,24 @@ class NetBoxConnectionThread(QThread):
         self.url = url
         self.token = token
         self.verify_ssl = verify_ssl
+        self.session = None  # pooled session, handed on to NetBoxAPI after a successful test
 
     def run(self):
         try:
             # Configure threading and SSL
-            import requests
             import pynetbox
+            from netbox_api import create_netbox_session
 
-            session = requests.Session()
-            if not self.verify_ssl:
-                session.verify = False
+            self.session = create_netbox_session(self.verify_ssl)
 
             nb = pynetbox.api(self.url, token=self.token)
-            nb.http_session = session
+            nb.http_session = self.session
 
-            # Test the connection by getting sites
-            sites = list(nb.dcim.sites.all())
+            # Test the connection with a single count request instead of paging through every site
+            site_count = nb.dcim.sites.count()
             ssl_status = "SSL verified" if self.verify_ssl else "SSL verification disabled"
-            message = f"Connected ({ssl_status}) - Found {len(sites)} sites"
-            self.connection_result.emit(True, message, len(sites))
+            message = f"Connected ({ssl_status}) - Found {site_count} sites"
+            self.connection_result.emit(True, message, site_count)
 
         except Exception as e:
             error_msg = str(e)
@@ -58,268 +94,382 @@ class TopologyLoadThread(QThread):
         try:
             self.progress_update.emit("Reading topology file...", 10)
 
-            with open(self.file_path, 'r') as f:
-                raw_data = json.load(f)
-
-            self.progress_update.emit("Validating topology data...", 30)
-
-            # Validate and clean the data structure
-            discovered_devices = self._validate_topology_data(raw_data)
+            if IJSON_AVAILABLE:
+                # Validate devices as they are parsed so the raw tree is never held whole
+                discovered_devices = self._stream_topology_data()
+            else:
+                with open(self.file_path, 'rb') as f:
+                    raw = f.read()
+                raw_data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+                if not isinstance(raw_data, dict):
+                    raise ValueError(TOPOLOGY_ROOT_ERROR)
+                # Release the file bytes before validation builds its copy, and the raw tree
+                # right after, so at most two of the three representations are alive at once
+                del raw
+
+                self.progress_update.emit("Validating topology data...", 30)
+
+                # Validate and clean the data structure
+                discovered_devices = self._validate_topology_data(raw_data)
+                del raw_data
 
             self.progress_update.emit("Processing device relationships...", 70)
 
-            # Add small delay to show progress (remove in production)
-            self.msleep(500)
-
             self.progress_update.emit("Topology loading complete", 100)
             self.load_complete.emit(discovered_devices)
 
-        except json.JSONDecodeError as e:
+        except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses this
+            self.load_error.emit(f"Invalid JSON format: {str(e)}")
+        except IJSON_ERRORS as e:
             self.load_error.emit(f"Invalid JSON format: {str(e)}")
         except Exception as e:
             self.load_error.emit(f"Error loading topology file: {str(e)}")
 
-    def _validate_topology_data(self, raw_data: Dict) -> Dict:
-        """Validate and normalize topology data structure"""
+    def _stream_topology_data(self) -> Dict:
+        """Stream top-level devices from the file with ijson, validating each as it arrives"""
         validated_devices = {}
-        total_devices = len(raw_data)
+        file_size = os.path.getsize(self.file_path) or 1
         processed = 0
+        last_progress = 30
 
-        for device_name, device_data in raw_data.items():
-            processed += 1
-            progress = 30 + int((processed / total_devices) * 40)  # 30-70% range
-            self.progress_update.emit(f"Processing device {processed}/{total_devices}: {device_name}", progress)
-
-            if not isinstance(device_name, str) or not device_name.strip():
-                continue  # Skip invalid device names
-
-            # Ensure device_data is a dictionary
-            if not isinstance(device_data, dict):
-                device_data = {}
-
-            # Normalize node_details
-            node_details = device_data.get('node_details', {})
-            if not isinstance(node_details, dict):
-                node_details = {}
+        self.progress_update.emit("Validating topology data...", 30)
 
-            validated_node_details = {
-                'ip': self._safe_get_string(node_details, 'ip'),
-                'platform': self._safe_get_string(node_details, 'platform')
-            }
+        with open(self.file_path, 'rb') as f:
+            # kvitems yields nothing for an array or scalar root, so check the first event first
+            first_event = next(ijson.parse(f), None)
+            if first_event is None or first_event[1] != 'start_map':
+                raise ValueError(TOPOLOGY_ROOT_ERROR)
+            f.seek(0)
 
-            # Normalize peers
-            peers = device_data.get('peers', {})
-            if not isinstance(peers, dict):
-                peers = {}
+            for device_name, device_data in ijson.kvitems(f, '', use_float=True):
+                processed += 1
+                # Only report when the percentage moves, the device total is unknown here
+                progress = 30 + int(min(f.tell() / file_size, 1) * 40)  # 30-70% range
+                if progress != last_progress:
+                    last_progress = progress
+                    self.progress_update.emit(f"Processing device {processed}: {device_name}", progress)
 
-            validated_peers = {}
-            for peer_name, peer_data in peers.items():
-                if not isinstance(peer_name, str) or not peer_name.strip():
-                    continue  # Skip invalid peer names
+                validated = self._validate_device(device_name, device_data)
+                if validated is not None:
+                    validated_devices[intern(device_name)] = validated
 
-                if not isinstance(peer_data, dict):
-                    peer_data = {}
+        return validated_devices
 
-                validated_peer = {
-                    'ip': self._safe_get_string(peer_data, 'ip'),
-                    'platform': self._safe_get_string(peer_data, 'platform'),
-                    'connections': self._safe_get_connections(peer_data.get('connections', []))
-                }
+    def _validate_topology_data(self, raw_data: Dict) -> Dict:
+        """Validate and normalize topology data structure"""
+        validated_devices = {}
+        total_devices = len(raw_data)
+        processed = 0
+        step = max(1, total_devices // PROGRESS_UPDATES)
 
-                validated_peers[peer_name] = validated_peer
+        for device_name, device_data in raw_data.items():
+            processed += 1
+            if processed % step == 0 or processed == total_devices:
+                progress = 30 + int((processed / total_devices) * 40)  # 30-70% range
+                self.progress_update.emit(f"Processing device {processed}/{total_devices}: {device_name}", progress)
 
-            validated_devices[device_name] = {
-                'node_details': validated_node_details,
-                'peers': validated_peers
-            }
+            validated = self._validate_device(device_name, device_data)
+            if validated is not None:
+                validated_devices[intern(device_name)] = validated
 
         return validated_devices
 
-    def _safe_get_string(self, data: Dict, key: str, default: str = '') -> str:
-        """Safely extract string value from dictionary"""
-        value = data.get(key, default)
-        if value is None:
-            return default
-        return str(value).strip()
-
-    def _safe_get_connections(self, connections_data) -> List:
-        """Safely extract and validate connections data"""
-        if not isinstance(connections_data, list):
-            return []
+    def _validate_device(self, device_name, device_data) -> Optional[Dict]:
+        """Normalize one device entry; returns None for entries that should be skipped"""
+        if not isinstance(device_name, str) or not device_name.strip():
+            return None  # Skip invalid device names
+
+        # Ensure device_data is a dictionary
+        if not isinstance(device_data, dict):
+            device_data = {}
+
+        # Normalize node_details
+        node_details = device_data.get('node_details', {})
+        if not isinstance(node_details, dict):
+            node_details = {}
+
+        # Missing/None values become '', everything else a stripped string. Names, IPs, platforms
+        # and interface names recur across devices and their peers, so each distinct string is
+        # interned and stored once instead of once per occurrence in the parsed file.
+        ip = node_details.get('ip')
+        platform = node_details.get('platform')
+        validated_node_details = {
+            'ip': intern(str(ip).strip()) if ip is not None else '',
+            'platform': intern(str(platform).strip()) if platform is not None else ''
+        }
 
-        validated_connections = []
-        for connection in connections_data:
-            if isinstance(connection, list) and len(connection) >= 2:
-                # Ensure both interface names are strings
-                local_int = str(connection[0]).strip() if connection[0] is not None else ''
-                remote_int = str(connection[1]).strip() if connection[1] is not None else ''
+        # Normalize peers
+        peers = device_data.get('peers', {})
+        if not isinstance(peers, dict):
+            peers = {}
+
+        validated_peers = {}
+        for peer_name, peer_data in peers.items():
+            if not isinstance(peer_name, str) or not peer_name.strip():
+                continue  # Skip invalid peer names
+
+            if not isinstance(peer_data, dict):
+                peer_data = {}
+
+            # Keep only [local, remote] pairs where both interface names are non-empty
+            connections = peer_data.get('connections', [])
+            if isinstance(connections, list):
+                validated_connections = [
+                    [local_int, remote_int]
+                    for connection in connections if isinstance(connection, list) and len(connection) >= 2
+                    for local_int, remote_int in ((
+                        intern(str(connection[0]).strip()) if connection[0] is not None else '',
+                        intern(str(connection[1]).strip()) if connection[1] is not None else ''
+                    ),)
+                    if local_int and remote_int
+                ]
+            else:
+                validated_connections = []
+
+            ip = peer_data.get('ip')
+            platform = peer_data.get('platform')
+            validated_peer = {
+                'ip': intern(str(ip).strip()) if ip is not None else '',
+                'platform': intern(str(platform).strip()) if platform is not None else '',
+                'connections': validated_connections
+            }
 
-                if local_int and remote_int:  # Only add if both interfaces are valid
-                    validated_connections.append([local_int, remote_int])
+            validated_peers[intern(peer_name)] = validated_peer
 
-        return validated_connections
+        return {
+            'node_details': validated_node_details,
+            'peers': validated_peers
+        }
 
 
 class NetBoxDataThread(QThread):
     """Thread for fetching NetBox data (sites, roles, device types, etc.)"""
 
-    data_ready = pyqtSignal(dict)  # All NetBox data in one dict
-    data_error = pyqtSignal(str)
+    data_ready = pyqtSignal(int, dict, dict)  # generation, all NetBox data in one dict, potential_matches
+    data_error = pyqtSignal(int, str)  # generation, error message
     progress_update = pyqtSignal(str, int)
 
-    def __init__(self, netbox_api):
+    def __init__(self, netbox_api, generation: int = 0, discovery_model=None):
         super().__init__()
         self.netbox_api = netbox_api
+        # Echoed back with the result so a superseded fetch can be recognised and ignored
+        self.generation = generation
+        # When given, existing devices are matched here rather than on the UI thread
+        self.discovery_model = discovery_model
 
     def run(self):
         try:
             data = {}
 
-            self.progress_update.emit("Fetching sites...", 10)
-            data['sites'] = self.netbox_api.get_sites()
-
-            self.progress_update.emit("Fetching device roles...", 30)
-            data['roles'] = self.netbox_api.get_device_roles()
-
-            self.progress_update.emit("Fetching device types...", 50)
-            data['device_types'] = self.netbox_api.get_device_types()
-
-            self.progress_update.emit("Fetching existing devices...", 70)
-            data['existing_devices'] = self.netbox_api.get_existing_devices()
+            # With the topology at hand, only the NetBox devices that could match it are fetched
+            get_existing_devices = self.netbox_api.get_existing_devices
+            if self.discovery_model is not None:
+                get_existing_devices = partial(get_existing_devices, self.discovery_model.all_device_names())
+
+            # The endpoints are independent and I/O bound, so fetch them concurrently
+            fetches = {
+                'sites': ("sites", self.netbox_api.get_sites),
+                'roles': ("device roles", self.netbox_api.get_device_roles),
+                'device_types': ("device types", self.netbox_api.get_device_types),
+                'existing_devices': ("existing devices", get_existing_devices),
+                'platforms': ("platforms", self.netbox_api.get_platforms),
+            }
 
-            self.progress_update.emit("Fetching platforms...", 90)
-            data['platforms'] = self.netbox_api.get_platforms()
+            self.progress_update.emit("Fetching NetBox data...", 10)
+
+            executor = _get_fetch_executor()
+            futures = {executor.submit(fetch): key for key, (_, fetch) in fetches.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                if self.isInterruptionRequested():
+                    for pending in futures:
+                        pending.cancel()
+                    return
+                key = futures[future]
+                data[key] = future.result()
+                progress = 10 + int(done / len(fetches) * 80)  # 10-90% range
+                self.progress_update.emit(f"Fetched {fetches[key][0]} ({done}/{len(fetches)})", progress)
+
+            potential_matches = {}
+            if self.discovery_model is not None:
+                self.progress_update.emit("Matching existing devices...", 95)
+                potential_matches = self.discovery_model.find_potential_matches(data['existing_devices'])
 
             self.progress_update.emit("Data fetch complete", 100)
-            self.data_ready.emit(data)
+            self.data_ready.emit(self.generation, data, potential_matches)
 
         except Exception as e:
-            self.data_error.emit(f"Error fetching NetBox data: {str(e)}")
+            self.data_error.emit(self.generation, f"Error fetching NetBox data: {str(e)}")
 
 
 class DeviceImportThread(QThread):
     """Thread for importing devices to NetBox"""
 
     import_progress = pyqtSignal(str, int, int)  # device_name, current, total
-    import_complete = pyqtSignal(int, int)  # successful, failed
+    # detailed_results is declared as object: PyQt passes it through as the same Python list,
+    # where a list argument would be converted to a QVariantList and rebuilt on the UI thread
+    import_complete = pyqtSignal(int, int, object)  # successful, failed, detailed_results
     import_error = pyqtSignal(str)
     device_created = pyqtSignal(str, bool, str)  # device_name, success, message
 
+    # Devices are created in bulk POSTs of up to this many devices
+    BULK_SIZE = 100
+
+    # Back off only when NetBox signals it is overloaded, instead of sleeping after every device
+    RETRY_STATUS_CODES = (429, 502, 503, 504)
+    MAX_RETRIES = 4
+    RETRY_BASE_DELAY_MS = 500
+
     def __init__(self, netbox_api, import_data: List[Dict], netbox_data: Dict = None):
         super().__init__()
         self.netbox_api = netbox_api
         self.import_data = import_data
         self.netbox_data = netbox_data or {}
         self.detailed_results = []
+        self._name_lookups = ()  # built at the start of run(), off the UI thread
 
     def run(self):
         successful = 0
         failed = 0
         total = len(self.import_data)
+        processed = 0
+        step = max(1, total // PROGRESS_UPDATES)
+        self._name_lookups = self._build_name_lookups()
 
-        for i, device_data in enumerate(self.import_data):
+        for start in range(0, total, self.BULK_SIZE):
             if self.isInterruptionRequested():
                 break
 
-            device_name = device_data.get('name', 'Unknown')
-            self.import_progress.emit(device_name, i + 1, total)
-
-            # Initialize result record
-            result = {
-                'name': device_name,
-                'success': False,
-                'netbox_id': '',
-                'message': '',
-                'ip_address': device_data.get('ip_address', ''),
-                'platform_name': '',
-                'site_name': '',
-                'role_name': '',
-                'device_type_name': ''
-            }
-
-            try:
-                # Get names for reporting by looking up IDs
-                result.update(self._get_netbox_names(device_data))
-
-                # Build device creation payload
-                device_payload = {
-                    'name': device_data['name'],
-                    'site': device_data['site_id'],
-                    'device_role': device_data['role_id'],
-                    'device_type': device_data['type_id'],
-                    'status': 'active'
+            # Build the result records and payloads for this batch
+            batch = []  # (result, payload or None, payload error)
+            for device_data in self.import_data[start:start + self.BULK_SIZE]:
+                result = {
+                    'name': device_data.get('name', 'Unknown'),
+                    'success': False,
+                    'netbox_id': '',
+                    'message': '',
+                    'ip_address': device_data.get('ip_address', ''),
+                    'platform_name': '',
+                    'site_name': '',
+                    'role_name': '',
+                    'device_type_name': ''
                 }
 
-                # Add platform if provided
-                if device_data.get('platform_id'):
-                    device_payload['platform'] = device_data['platform_id']
-
-                # Create device in NetBox
-                created_device = self.netbox_api.create_device(device_payload)
+                try:
+                    # Get names for reporting by looking up IDs
+                    result.update(self._get_netbox_names(device_data))
+                    batch.append((result, self._build_payload(device_data), None))
+                except Exception as e:
+                    batch.append((result, None, e))
+
+            # Create every valid device of the batch in one request
+            payloads = [payload for _, payload, _ in batch if payload is not None]
+            outcomes = iter([])
+            if payloads:
+                outcomes = iter(self._create_batch(payloads))
+                # Cached device lists are dropped once per batch, not per created device
+                self.netbox_api.invalidate('existing_devices')
+
+            for result, payload, error in batch:
+                processed += 1
+                device_name = result['name']
+                if processed % step == 0 or processed == total:
+                    self.import_progress.emit(device_name, processed, total)
+
+                outcome = error if payload is None else next(outcomes)
+                if isinstance(outcome, Exception):
+                    failed += 1
+                    result['message'] = f"Failed: {str(outcome)}"
+                    self.device_created.emit(device_name, False, result['message'])
+                else:
+                    successful += 1
+                    result['success'] = True
+                    result['netbox_id'] = str(outcome.id)
+                    result['message'] = f"Created successfully (ID: {outcome.id})"
+                    self.device_created.emit(device_name, True, result['message'])
+
+                # Add to detailed results
+                self.detailed_results.append(result)
 
-                successful += 1
-                result['success'] = True
-                result['netbox_id'] = str(created_device.id)
-                result['message'] = f"Created successfully (ID: {created_device.id})"
+        self.import_complete.emit(successful, failed, self.detailed_results)
 
-                self.device_created.emit(device_name, True, result['message'])
+    def _build_payload(self, device_data: Dict) -> Dict:
+        """Build the device creation payload"""
+        device_payload = {
+            'name': device_data['name'],
+            'site': device_data['site_id'],
+            'device_role': device_data['role_id'],
+            'device_type': device_data['type_id'],
+            'status': 'active'
+        }
 
-            except Exception as e:
-                failed += 1
-                result['success'] = False
-                result['message'] = f"Failed: {str(e)}"
+        # Add platform if provided
+        if device_data.get('platform_id'):
+            device_payload['platform'] = device_data['platform_id']
 
-                self.device_created.emit(device_name, False, result['message'])
+        return device_payload
 
-            # Add to detailed results
-            self.detailed_results.append(result)
+    def _create_batch(self, payloads: List[Dict]) -> List:
+        """Create devices with one bulk request, returning the created device or exception per payload.
 
-            # Small delay to prevent overwhelming the API
-            self.msleep(100)
+        NetBox rejects a whole bulk request if any device in it is invalid, so on a 4xx the
+        batch is retried one device at a time to report each device's own outcome. Any other
+        failure (connection error, server error after retries) is reported for the whole batch."""
+        from pynetbox import RequestError
 
-        self.import_complete.emit(successful, failed, self.detailed_results)
+        try:
+            return list(self._call_with_backoff(self.netbox_api.create_devices_bulk, payloads))
+        except Exception as e:
+            status_code = getattr(e.req, 'status_code', None) if isinstance(e, RequestError) else None
+            if len(payloads) == 1 or status_code is None or not 400 <= status_code < 500:
+                return [e] * len(payloads)
 
-    def _get_netbox_names(self, device_data: Dict) -> Dict:
-        """Get human-readable names for NetBox IDs"""
-        names = {
-            'platform_name': '',
-            'site_name': '',
-            'role_name': '',
-            'device_type_name': ''
-        }
+        outcomes = []
+        for payload in payloads:
+            try:
+                outcomes.append(self._call_with_backoff(self.netbox_api.create_device, payload))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
 
-        try:
-            # Platform name
-            if device_data.get('platform_id') and 'platforms' in self.netbox_data:
-                for platform in self.netbox_data['platforms']:
-                    if hasattr(platform, 'id') and platform.id == device_data['platform_id']:
-                        names['platform_name'] = platform.name
-                        break
-
-            # Site name
-            if device_data.get('site_id') and 'sites' in self.netbox_data:
-                for site in self.netbox_data['sites']:
-                    if hasattr(site, 'id') and site.id == device_data['site_id']:
-                        names['site_name'] = site.name
-                        break
-
-            # Role name
-            if device_data.get('role_id') and 'roles' in self.netbox_data:
-                for role in self.netbox_data['roles']:
-                    if hasattr(role, 'id') and role.id == device_data['role_id']:
-                        names['role_name'] = role.name
-                        break
-
-            # Device type name
-            if device_data.get('type_id') and 'device_types' in self.netbox_data:
-                for device_type in self.netbox_data['device_types']:
-                    if hasattr(device_type, 'id') and device_type.id == device_data['type_id']:
-                        manufacturer_name = getattr(device_type.manufacturer, 'name',
-                                                    'Unknown') if device_type.manufacturer else 'Unknown'
-                        names['device_type_name'] = f"{manufacturer_name} - {device_type.model}"
-                        break
+    def _call_with_backoff(self, create, payload):
+        """Run a create call, retrying with exponential backoff on rate-limit/overload responses"""
+        from pynetbox import RequestError
 
-        except Exception as e:
-            print(f"Error getting NetBox names: {e}")
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                return create(payload)
+            except RequestError as e:
+                status_code = getattr(e.req, 'status_code', None)
+                if (status_code not in self.RETRY_STATUS_CODES or attempt == self.MAX_RETRIES
+                        or self.isInterruptionRequested()):
+                    raise
+                self.msleep(self.RETRY_BASE_DELAY_MS * (2 ** attempt))
+
+    def _build_name_lookups(self) -> tuple:
+        """Map NetBox ids to human-readable names once per import, per result field"""
+        def type_label(device_type):
+            manufacturer_name = getattr(device_type.manufacturer, 'name',
+                                        'Unknown') if device_type.manufacturer else 'Unknown'
+            return f"{manufacturer_name} - {device_type.model}"
+
+        lookups = []
+        for name_key, id_key, data_key, label in (
+                ('platform_name', 'platform_id', 'platforms', lambda platform: platform.name),
+                ('site_name', 'site_id', 'sites', lambda site: site.name),
+                ('role_name', 'role_id', 'roles', lambda role: role.name),
+                ('device_type_name', 'type_id', 'device_types', type_label)):
+            names_by_id = {}
+            try:
+                for item in self.netbox_data.get(data_key, []):
+                    item_id = getattr(item, 'id', None)
+                    if item_id is not None:
+                        names_by_id.setdefault(item_id, label(item))
+            except Exception as e:
+                print(f"Error getting NetBox names: {e}")
+            lookups.append((name_key, id_key, names_by_id))
+        return tuple(lookups)
 
-        return names
\ No newline at end of file
+    def _get_netbox_names(self, device_data: Dict) -> Dict:
+        """Get human-readable names for NetBox IDs"""
+        return {name_key: names_by_id.get(device_data.get(id_key), '')
+                for name_key, id_key, names_by_id in self._name_lookups}
\ No newline at end of file
@@ -2,22 +2,273 @@
 UI Components for NetBox Import Wizard
 Contains the custom table widget and UI helper functions
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from PyQt6.QtWidgets import (
-    QTableWidget, QTableWidgetItem, QComboBox, QCheckBox, QWidget
+    QTableView, QAbstractItemView, QComboBox, QWidget, QStyledItemDelegate,
+    QStyleOptionComboBox, QStyle, QApplication
 )
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QColor
+from PyQt6.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QColor, QStandardItem, QStandardItemModel
+
+# NetBox Status codes returned for the status column's UserRole
+STATUS_NEW = 0
+STATUS_MATCH = 1
+
+# Device table columns; each model row stores one value per column in this order
+COL_IMPORT = 0
+COL_NAME = 1
+COL_IP = 2
+COL_DISCOVERED_PLATFORM = 3
+COL_PLATFORM = 4
+COL_STATUS = 5
+COL_SITE = 6
+COL_ROLE = 7
+COL_DEVICE_TYPE = 8
+
+# Dropdown columns in the device table
+CHOICE_COLUMNS = (COL_PLATFORM, COL_SITE, COL_ROLE, COL_DEVICE_TYPE)
+
+# Free-text columns the user may edit before import
+TEXT_COLUMNS = (COL_NAME, COL_IP)
+
+# Common aliases of network device platforms, keyed by the NetBox platform name they map to
+PLATFORM_ALIASES = {
+    'cisco_ios': ['ios', 'cisco-ios', 'cisco_ios'],
+    'cisco_nxos': ['nxos', 'cisco-nxos', 'cisco_nxos', 'nexus'],
+    'cisco_iosxe': ['iosxe', 'cisco-iosxe', 'cisco_iosxe'],
+    'arista_eos': ['eos', 'arista-eos', 'arista_eos', 'arista'],
+    'juniper_junos': ['junos', 'juniper-junos', 'juniper_junos', 'juniper'],
+    'panos': ['palo-alto', 'paloalto', 'pan-os'],
+    'fortios': ['fortinet', 'fortigate'],
+    'linux': ['ubuntu', 'centos', 'rhel', 'debian'],
+    'windows': ['win', 'microsoft']
+}
+
+HEADERS = [
+    'Import', 'Device Name', 'IP Address', 'Discovered Platform',
+    'NetBox Platform', 'NetBox Status', 'Site', 'Role', 'Device Type'
+]
+
+# Cell colours shared by every row; QColor is implicitly shared, so items just copy a reference
+_BLACK = QColor(0, 0, 0)
+_YELLOW = QColor(255, 255, 0)
+_LT_GREEN = QColor(144, 238, 144)
+
+
+def device_type_label(device_type) -> str:
+    """Display text for a NetBox device type"""
+    manufacturer_name = getattr(device_type.manufacturer, 'name',
+                                'Unknown') if device_type.manufacturer else 'Unknown'
+    return f"{manufacturer_name} - {device_type.model}"
+
+
+def build_combo_model(items: List, default_text: str, label=lambda item: item.name,
+                      parent=None, value=lambda item: item.id) -> QStandardItemModel:
+    """Build a combo box model with a placeholder row followed by one row per NetBox object.
+
+    The object's id (or value(item)) is stored in UserRole, which is what
+    QComboBox.currentData()/itemData() read."""
+    model = QStandardItemModel(parent)
+    model.appendRow(QStandardItem(default_text))
+    for item in items:
+        model_item = QStandardItem(label(item))
+        model_item.setData(value(item), Qt.ItemDataRole.UserRole)
+        model.appendRow(model_item)
+    return model
+
 
+class DeviceTableModel(QAbstractTableModel):
+    """Table model holding one plain list of column values per device row.
 
-class DeviceTableWidget(QTableWidget):
-    """Custom table widget with checkbox selection and platform dropdown"""
+    The import column holds a bool, the status column the number of NetBox matches, and the
+    dropdown columns the selected NetBox id (or None); labels and colours are derived in data()."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows: List[list] = []
+        self.selected_rows: Set[int] = set()
+        # Per dropdown column: NetBox id -> label, and the placeholder shown when unset
+        self._choice_labels: Dict[int, Dict[int, str]] = {}
+        self._choice_placeholders: Dict[int, str] = {}
+
+    def set_choices(self, column: int, labels: Dict[int, str], placeholder: str):
+        self._choice_labels[column] = labels
+        self._choice_placeholders[column] = placeholder
+
+    def choice_text(self, column: int, value) -> str:
+        """Label of a dropdown value, or the column's placeholder when unset"""
+        label = self._choice_labels.get(column, {}).get(value)
+        return label if label is not None else self._choice_placeholders.get(column, '')
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.selected_rows.clear()
+        self.endResetModel()
+
+    def append_rows(self, rows: List[list]):
+        """Append rows with a single insert notification"""
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.selected_rows.update(row for row, values in enumerate(rows, first) if values[COL_IMPORT])
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == COL_IMPORT:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        elif index.column() in CHOICE_COLUMNS or index.column() in TEXT_COLUMNS:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        value = self.rows[index.row()][column]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == COL_IMPORT:
+                return None
+            if column in CHOICE_COLUMNS:
+                return self.choice_text(column, value)
+            if column == COL_STATUS:
+                return f"Found {value} match(es)" if value else "New device"
+            return value
+        if role == Qt.ItemDataRole.EditRole and column in TEXT_COLUMNS:
+            return value
+        if role == Qt.ItemDataRole.UserRole:
+            if column in CHOICE_COLUMNS:
+                return value
+            if column == COL_STATUS:
+                return STATUS_MATCH if value else STATUS_NEW
+        elif role == Qt.ItemDataRole.CheckStateRole and column == COL_IMPORT:
+            return Qt.CheckState.Checked if value else Qt.CheckState.Unchecked
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            if column == COL_DISCOVERED_PLATFORM:
+                return _BLACK  # Light gray background
+            if column == COL_STATUS:
+                return _YELLOW if value else _LT_GREEN
+        elif role == Qt.ItemDataRole.ForegroundRole and column == COL_STATUS:
+            return _BLACK
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid():
+            return False
+        column = index.column()
+        if column == COL_IMPORT and role == Qt.ItemDataRole.CheckStateRole:
+            self.set_rows_checked([index.row()], Qt.CheckState(value) == Qt.CheckState.Checked)
+            return True
+        if column in CHOICE_COLUMNS and role == Qt.ItemDataRole.UserRole:
+            self.rows[index.row()][column] = value
+            self.dataChanged.emit(index, index)
+            return True
+        if column in TEXT_COLUMNS and role == Qt.ItemDataRole.EditRole:
+            text = str(value).strip()
+            if column == COL_NAME and not text:
+                return False  # a device cannot be imported without a name
+            self.rows[index.row()][column] = text
+            self.dataChanged.emit(index, index)
+            return True
+        return False
+
+    def set_values(self, rows, values: Dict[int, object]):
+        """Write the same column values into several rows with one change notification"""
+        rows = list(rows)
+        if not rows or not values:
+            return
+        for row in rows:
+            row_values = self.rows[row]
+            for column, value in values.items():
+                row_values[column] = value
+        self.dataChanged.emit(self.index(min(rows), min(values)), self.index(max(rows), max(values)))
+
+    def set_column_values(self, column: int, values_by_row: Dict[int, object]):
+        """Write per-row values into one column with one change notification"""
+        if not values_by_row:
+            return
+        for row, value in values_by_row.items():
+            self.rows[row][column] = value
+        self.dataChanged.emit(self.index(min(values_by_row), column), self.index(max(values_by_row), column))
+
+    def set_rows_checked(self, rows, checked: bool):
+        """Check or uncheck the import column of several rows with one change notification"""
+        rows = list(rows)
+        if not rows:
+            return
+        for row in rows:
+            self.rows[row][COL_IMPORT] = checked
+        if checked:
+            self.selected_rows.update(rows)
+        else:
+            self.selected_rows.difference_update(rows)
+        self.dataChanged.emit(self.index(min(rows), COL_IMPORT), self.index(max(rows), COL_IMPORT),
+                              [Qt.ItemDataRole.CheckStateRole])
+
+
+class NetBoxComboDelegate(QStyledItemDelegate):
+    """Draws a dropdown column as a combo box and creates a real QComboBox only while editing.
+
+    The model holds the selected NetBox id in UserRole and derives the label shown;
+    the editor shares the table's dropdown model for the column."""
+
+    def __init__(self, table: 'DeviceTableWidget'):
+        super().__init__(table)
+        self.table = table
+
+    def paint(self, painter, option, index):
+        opt = QStyleOptionComboBox()
+        opt.rect = option.rect
+        opt.state = option.state | QStyle.StateFlag.State_Enabled
+        opt.currentText = index.data() or ''
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawComplexControl(QStyle.ComplexControl.CC_ComboBox, opt, painter, option.widget)
+        style.drawControl(QStyle.ControlElement.CE_ComboBoxLabel, opt, painter, option.widget)
+
+    def createEditor(self, parent, option, index):
+        combo = QComboBox(parent)
+        combo.setModel(self.table._combo_models[index.column()])
+        # Commit as soon as an entry is picked rather than when focus leaves the cell
+        combo.activated.connect(lambda _: self.commitData.emit(combo))
+        QTimer.singleShot(0, combo.showPopup)
+        return combo
+
+    def setEditorData(self, editor, index):
+        value = index.data(Qt.ItemDataRole.UserRole)
+        editor.setCurrentIndex(self.table._combo_rows.get(index.column(), {}).get(value, 0))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentData(), Qt.ItemDataRole.UserRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
+
+
+class DeviceTableWidget(QTableView):
+    """Device table view over a DeviceTableModel, with checkbox selection and NetBox dropdowns"""
 
     population_progress = pyqtSignal(int, int)
     population_complete = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._model = DeviceTableModel(self)
+        self.setModel(self._model)
         self.setup_table()
 
         # For chunked loading
@@ -26,17 +277,29 @@ class DeviceTableWidget(QTableWidget):
         self.devices_to_populate = []
         self.netbox_data_cache = {}
         self.current_chunk_index = 0
-        self.chunk_size = 50
+        # Chunks only build plain row lists now, so they can be much larger than a per-item insert allowed
+        self.chunk_size = 500
+        # Rows built so far, inserted into the model in one go once every chunk is done
+        self._pending_rows: List[list] = []
+
+        # One dropdown model per column, shared by every row's combo box,
+        # plus NetBox id -> model row lookups for selecting by id
+        self._combo_models: Dict[int, QStandardItemModel] = {}
+        self._combo_rows: Dict[int, Dict[int, int]] = {}
+        self._platform_matches: Dict[str, Optional[object]] = {}
+        # NetBox platforms with lower-cased names, computed once per population for matching
+        self._platform_names: List[tuple] = []
+        self._platforms_by_name: Dict[str, object] = {}
+
+        # Dropdown cells are painted by a delegate; a combo box only exists while one is edited
+        self._combo_delegate = NetBoxComboDelegate(self)
+        for column in CHOICE_COLUMNS:
+            self.setItemDelegateForColumn(column, self._combo_delegate)
+        self.clicked.connect(self._on_cell_clicked)
 
     def setup_table(self):
-        headers = [
-            'Import', 'Device Name', 'IP Address', 'Discovered Platform',
-            'NetBox Platform', 'NetBox Status', 'Site', 'Role', 'Device Type'
-        ]
-        self.setColumnCount(len(headers))
-        self.setHorizontalHeaderLabels(headers)
         self.setAlternatingRowColors(True)
-        self.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
 
         # Adjust column widths
         self.setColumnWidth(0, 60)  # Import checkbox
@@ -46,58 +309,114 @@ class DeviceTableWidget(QTableWidget):
         self.setColumnWidth(4, 120)  # NetBox Platform
         self.setColumnWidth(5, 120)  # NetBox Status
 
+    @property
+    def selected_rows(self) -> Set[int]:
+        """Rows whose import checkbox is checked"""
+        return self._model.selected_rows
+
+    def rowCount(self) -> int:
+        return self._model.rowCount()
+
+    def cell_text(self, row: int, column: int) -> str:
+        """Text shown in a cell"""
+        return self._model.data(self._model.index(row, column)) or ''
+
     def populate_devices_with_netbox_data(self, devices: Dict, potential_matches: Dict, netbox_data: Dict):
         """Populate table with discovered devices using chunked loading"""
-        self.setRowCount(0)
+        self._model.clear()
 
         device_list = self._prepare_device_list(devices, potential_matches)
 
         self.netbox_data_cache = netbox_data
+        self._build_combo_models(netbox_data)
         self.devices_to_populate = device_list
         self.current_chunk_index = 0
-
-        self.setRowCount(len(device_list))
+        self._pending_rows = []
 
         if device_list:
             self.population_timer.start(10)
+        else:
+            self.population_complete.emit()
+
+    def _build_combo_models(self, netbox_data: Dict):
+        """Build the shared dropdown models once per population"""
+        columns = (
+            (COL_PLATFORM, netbox_data.get('platforms', []), "-- Select Platform --", lambda p: p.name),
+            (COL_SITE, netbox_data.get('sites', []), "-- Select Site --", lambda s: s.name),
+            (COL_ROLE, netbox_data.get('roles', []), "-- Select Role --", lambda r: r.name),
+            (COL_DEVICE_TYPE, netbox_data.get('device_types', []), "-- Select Device Type --", device_type_label),
+        )
+        for model in self._combo_models.values():
+            model.deleteLater()
+
+        # Rows share few distinct discovered platforms, so auto-matching is memoized per string,
+        # and the platform names it compares against are lower-cased only once
+        self._platform_matches = {}
+        self._platform_names = [(platform.name.lower(), platform) for platform in netbox_data.get('platforms', [])]
+        self._platforms_by_name = {}
+        for platform_name_lower, platform in self._platform_names:
+            self._platforms_by_name.setdefault(platform_name_lower, platform)
+
+        for column, items, default_text, label in columns:
+            self._combo_models[column] = build_combo_model(items, default_text, label, parent=self)
+            self._combo_rows[column] = {item.id: index for index, item in enumerate(items, 1)}
+            self._model.set_choices(column, {item.id: label(item) for item in items}, default_text)
+
+    def combo_model(self, column: int) -> Optional[QStandardItemModel]:
+        """Shared dropdown model of a column: placeholder row, then NetBox objects with ids in UserRole"""
+        return self._combo_models.get(column)
+
+    def _on_cell_clicked(self, index):
+        # Open dropdown cells on a single click, like the combo boxes they replace
+        if index.column() in self._combo_models:
+            self.edit(index)
+
+    def get_choice_value(self, row: int, column: int):
+        """Return the NetBox id selected in a dropdown cell, or None if unset"""
+        return self._model.rows[row][column] if 0 <= row < len(self._model.rows) else None
+
+    def set_choice_value(self, row: int, column: int, value) -> bool:
+        """Select the dropdown entry whose NetBox id is value; returns False if not found"""
+        if not 0 <= row < len(self._model.rows) or value not in self._combo_rows.get(column, {}):
+            return False
+        return self._model.setData(self._model.index(row, column), value, Qt.ItemDataRole.UserRole)
 
     def _prepare_device_list(self, devices: Dict, potential_matches: Dict):
         """Prepare the device list for population"""
-        device_list = []
+        unique_devices = []
+        seen_names = set()
 
         for device_name, device_data in devices.items():
             node_details = device_data.get('node_details', {})
             if not isinstance(node_details, dict):
                 node_details = {}
 
-            device_list.append({
-                'name': device_name,
-                'ip': node_details.get('ip', '').strip(),
-                'platform': node_details.get('platform', '').strip(),
-                'matches': potential_matches.get(device_name, [])
-            })
+            if device_name.strip() and device_name not in seen_names:
+                seen_names.add(device_name)
+                unique_devices.append({
+                    'name': device_name,
+                    'ip': node_details.get('ip', '').strip(),
+                    'platform': node_details.get('platform', '').strip(),
+                    'matches': potential_matches.get(device_name, [])
+                })
 
             peers = device_data.get('peers', {})
             if isinstance(peers, dict):
                 for peer_name, peer_data in peers.items():
-                    if peer_name not in devices:
-                        if not isinstance(peer_data, dict):
-                            peer_data = {}
-
-                        device_list.append({
-                            'name': peer_name,
-                            'ip': peer_data.get('ip', '').strip(),
-                            'platform': peer_data.get('platform', '').strip(),
-                            'matches': potential_matches.get(peer_name, [])
-                        })
-
-        # Remove duplicates
-        seen_names = set()
-        unique_devices = []
-        for device in device_list:
-            if device['name'] not in seen_names and device['name'].strip():
-                unique_devices.append(device)
-                seen_names.add(device['name'])
+                    # Skip duplicates: main devices and peers already listed
+                    if peer_name in devices or peer_name in seen_names or not peer_name.strip():
+                        continue
+
+                    if not isinstance(peer_data, dict):
+                        peer_data = {}
+
+                    seen_names.add(peer_name)
+                    unique_devices.append({
+                        'name': peer_name,
+                        'ip': peer_data.get('ip', '').strip(),
+                        'platform': peer_data.get('platform', '').strip(),
+                        'matches': potential_matches.get(peer_name, [])
+                    })
 
         return unique_devices
 
@@ -105,101 +424,43 @@ class DeviceTableWidget(QTableWidget):
         """Populate a chunk of devices"""
         if self.current_chunk_index >= len(self.devices_to_populate):
             self.population_timer.stop()
+            # One insert for the whole table: the view lays out once instead of once per chunk
+            self._model.append_rows(self._pending_rows)
+            self._pending_rows = []
             self.population_complete.emit()
             print(f"Populated {len(self.devices_to_populate)} devices")
             return
 
-        sites = self.netbox_data_cache.get('sites', [])
-        roles = self.netbox_data_cache.get('roles', [])
-        device_types = self.netbox_data_cache.get('device_types', [])
-        platforms = self.netbox_data_cache.get('platforms', [])
-
         end_index = min(self.current_chunk_index + self.chunk_size, len(self.devices_to_populate))
 
-        for i in range(self.current_chunk_index, end_index):
-            device = self.devices_to_populate[i]
-            self._populate_device_row(i, device, sites, roles, device_types, platforms)
+        self._pending_rows.extend(self._build_device_row(device)
+                                  for device in self.devices_to_populate[self.current_chunk_index:end_index])
 
         self.population_progress.emit(end_index, len(self.devices_to_populate))
         self.current_chunk_index = end_index
 
-    def _populate_device_row(self, row: int, device: Dict, sites: List, roles: List, device_types: List,
-                             platforms: List):
-        """Populate a single device row with checkbox and platform dropdown"""
-
-        # Import Checkbox
-        import_checkbox = QCheckBox()
-        import_checkbox.setChecked(False)
-        if self._should_auto_select(device):
-            import_checkbox.setChecked(True)
-        self.setCellWidget(row, 0, import_checkbox)
-
-        # Device Name
-        self.setItem(row, 1, QTableWidgetItem(device['name']))
-
-        # IP Address
-        self.setItem(row, 2, QTableWidgetItem(device['ip']))
-
-        # Discovered Platform (read-only)
-        discovered_platform = device['platform']
-        platform_item = QTableWidgetItem(discovered_platform)
-        platform_item.setFlags(platform_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-        platform_item.setBackground(QColor(0, 0, 0))  # Light gray background
-        self.setItem(row, 3, platform_item)
-
-        # NetBox Platform Dropdown
-        platform_combo = QComboBox()
-        platform_combo.addItem("-- Select Platform --", None)
-
-        for platform in platforms:
-            platform_combo.addItem(platform.name, platform.id)
-
-        # Try to auto-match platform
-        auto_matched_platform = self._find_matching_platform(discovered_platform, platforms)
-        if auto_matched_platform:
-            for i in range(platform_combo.count()):
-                if platform_combo.itemData(i) == auto_matched_platform.id:
-                    platform_combo.setCurrentIndex(i)
-                    break
-
-        self.setCellWidget(row, 4, platform_combo)
-
-        # NetBox Status
-        if device['matches']:
-            status_text = f"Found {len(device['matches'])} match(es)"
-            status_item = QTableWidgetItem(status_text)
-            status_item.setBackground(QColor(255, 255, 0))  # Yellow
-            status_item.setForeground(QColor(0, 0, 0))
-        else:
-            status_item = QTableWidgetItem("New device")
-            status_item.setBackground(QColor(144, 238, 144))  # Light green
-            status_item.setForeground(QColor(0, 0, 0))
-        self.setItem(row, 5, status_item)
-
-        # Site ComboBox
-        site_combo = QComboBox()
-        site_combo.addItem("-- Select Site --", None)
-        for site in sites:
-            site_combo.addItem(site.name, site.id)
-        self.setCellWidget(row, 6, site_combo)
-
-        # Role ComboBox
-        role_combo = QComboBox()
-        role_combo.addItem("-- Select Role --", None)
-        for role in roles:
-            role_combo.addItem(role.name, role.id)
-        self.setCellWidget(row, 7, role_combo)
-
-        # Device Type ComboBox
-        type_combo = QComboBox()
-        type_combo.addItem("-- Select Device Type --", None)
-        for device_type in device_types:
-            manufacturer_name = getattr(device_type.manufacturer, 'name',
-                                        'Unknown') if device_type.manufacturer else 'Unknown'
-            type_combo.addItem(f"{manufacturer_name} - {device_type.model}", device_type.id)
-        self.setCellWidget(row, 8, type_combo)
-
-    def _find_matching_platform(self, discovered_platform: str, netbox_platforms: List) -> Optional[object]:
+    def _build_device_row(self, device: Dict) -> list:
+        """Build the model row for a device, with the NetBox platform auto-matched when possible"""
+        auto_matched_platform = self.match_platform(device['platform'])
+        return [
+            bool(self._should_auto_select(device)),
+            device['name'],
+            device['ip'],
+            device['platform'],
+            auto_matched_platform.id if auto_matched_platform else None,
+            len(device['matches']),
+            None,  # Site
+            None,  # Role
+            None,  # Device Type
+        ]
+
+    def match_platform(self, discovered_platform: str) -> Optional[object]:
+        """Return the NetBox platform matching a discovered platform, memoized per population"""
+        if discovered_platform not in self._platform_matches:
+            self._platform_matches[discovered_platform] = self._find_matching_platform(discovered_platform)
+        return self._platform_matches[discovered_platform]
+
+    def _find_matching_platform(self, discovered_platform: str) -> Optional[object]:
         """Try to automatically match discovered platform to NetBox platform"""
         if not discovered_platform:
             return None
@@ -207,32 +468,15 @@ class DeviceTableWidget(QTableWidget):
         discovered_lower = discovered_platform.lower().strip()
 
         # Direct name matches
-        for platform in netbox_platforms:
-            if platform.name.lower() == discovered_lower:
-                return platform
-
-        # Common mappings for network device platforms
-        platform_mappings = {
-            'cisco_ios': ['ios', 'cisco-ios', 'cisco_ios'],
-            'cisco_nxos': ['nxos', 'cisco-nxos', 'cisco_nxos', 'nexus'],
-            'cisco_iosxe': ['iosxe', 'cisco-iosxe', 'cisco_iosxe'],
-            'arista_eos': ['eos', 'arista-eos', 'arista_eos', 'arista'],
-            'juniper_junos': ['junos', 'juniper-junos', 'juniper_junos', 'juniper'],
-            'panos': ['palo-alto', 'paloalto', 'pan-os'],
-            'fortios': ['fortinet', 'fortigate'],
-            'linux': ['ubuntu', 'centos', 'rhel', 'debian'],
-            'windows': ['win', 'microsoft']
-        }
-
-        # Try to find matches using mappings
-        for platform in netbox_platforms:
-            platform_name_lower = platform.name.lower()
+        platform = self._platforms_by_name.get(discovered_lower)
+        if platform is not None:
+            return platform
 
+        for platform_name_lower, platform in self._platform_names:
             # Check if discovered platform matches any known aliases
-            for netbox_name, aliases in platform_mappings.items():
-                if platform_name_lower == netbox_name:
-                    if discovered_lower in aliases or any(alias in discovered_lower for alias in aliases):
-                        return platform
+            aliases = PLATFORM_ALIASES.get(platform_name_lower)
+            if aliases and (discovered_lower in aliases or any(alias in discovered_lower for alias in aliases)):
+                return platform
 
             # Partial string matching as fallback
             if discovered_lower in platform_name_lower or platform_name_lower in discovered_lower:
@@ -240,6 +484,15 @@ class DeviceTableWidget(QTableWidget):
 
         return None
 
+    def is_row_selected(self, row: int) -> bool:
+        """Check whether a row is selected for import"""
+        return row in self.selected_rows
+
+    def set_row_selected(self, row: int, checked: bool):
+        """Check or uncheck the import checkbox of a row"""
+        if 0 <= row < len(self._model.rows):
+            self._model.set_rows_checked([row], checked)
+
     def _should_auto_select(self, device: Dict) -> bool:
         """Determine if device should be auto-selected"""
         has_ip = device.get('ip') and device['ip'].strip()
@@ -253,71 +506,52 @@ class DeviceTableWidget(QTableWidget):
     def get_selected_devices_for_import(self):
         """Get list of devices selected for import with their configuration"""
         devices_to_import = []
-
-        for row in range(self.rowCount()):
-            import_checkbox = self.cellWidget(row, 0)
-            if import_checkbox and import_checkbox.isChecked():
-                device_name = self.item(row, 1).text()
-                platform_combo = self.cellWidget(row, 4)
-                site_combo = self.cellWidget(row, 6)
-                role_combo = self.cellWidget(row, 7)
-                type_combo = self.cellWidget(row, 8)
-
-                devices_to_import.append({
-                    'name': device_name,
-                    'platform_id': platform_combo.currentData() if platform_combo else None,
-                    'site_id': site_combo.currentData() if site_combo else None,
-                    'role_id': role_combo.currentData() if role_combo else None,
-                    'type_id': type_combo.currentData() if type_combo else None
-                })
+        rows = self._model.rows
+
+        # Only checked rows are visited, reading the model's row lists directly
+        for row in sorted(self.selected_rows):
+            values = rows[row]
+            devices_to_import.append({
+                'name': values[COL_NAME],
+                'ip_address': values[COL_IP],
+                'platform_id': values[COL_PLATFORM],
+                'site_id': values[COL_SITE],
+                'role_id': values[COL_ROLE],
+                'type_id': values[COL_DEVICE_TYPE]
+            })
 
         return devices_to_import
 
     def select_all_devices(self, checked: bool = True):
         """Select or deselect all devices"""
-        for row in range(self.rowCount()):
-            checkbox = self.cellWidget(row, 0)
-            if checkbox:
-                checkbox.setChecked(checked)
+        self._model.set_rows_checked(range(self.rowCount()), checked)
 
     def select_devices_by_discovered_platform(self, platform: str, checked: bool = True):
         """Select devices by their discovered platform"""
-        for row in range(self.rowCount()):
-            platform_item = self.item(row, 3)  # Discovered Platform column
-            if platform_item and platform_item.text() == platform:
-                checkbox = self.cellWidget(row, 0)
-                if checkbox:
-                    checkbox.setChecked(checked)
+        self._model.set_rows_checked(
+            [row for row, values in enumerate(self._model.rows) if values[COL_DISCOVERED_PLATFORM] == platform],
+            checked)
+
+    def auto_map_platforms(self) -> int:
+        """Fill every unset platform cell from its discovered platform; returns the number mapped"""
+        valid_ids = self._combo_rows.get(COL_PLATFORM, {})
+        mapped = {}
+        for row, values in enumerate(self._model.rows):
+            if values[COL_PLATFORM] is not None or not values[COL_DISCOVERED_PLATFORM]:
+                continue
+            platform = self.match_platform(values[COL_DISCOVERED_PLATFORM])
+            if platform is not None and platform.id in valid_ids:
+                mapped[row] = platform.id
+
+        self._model.set_column_values(COL_PLATFORM, mapped)
+        return len(mapped)
 
     def apply_defaults_to_selected(self, site_id=None, role_id=None, platform_id=None):
         """Apply default site/role/platform to selected devices"""
-        for row in range(self.rowCount()):
-            checkbox = self.cellWidget(row, 0)
-            if checkbox and checkbox.isChecked():
-
-                if site_id:
-                    site_combo = self.cellWidget(row, 6)
-                    if site_combo:
-                        for i in range(site_combo.count()):
-                            if site_combo.itemData(i) == site_id:
-                                site_combo.setCurrentIndex(i)
-                                break
-
-                if role_id:
-                    role_combo = self.cellWidget(row, 7)
-                    if role_combo:
-                        for i in range(role_combo.count()):
-                            if role_combo.itemData(i) == role_id:
-                                role_combo.setCurrentIndex(i)
-                                break
-
-                if platform_id:
-                    platform_combo = self.cellWidget(row, 4)
-                    if platform_combo:
-                        for i in range(platform_combo.count()):
-                            if platform_combo.itemData(i) == platform_id:
-                                platform_combo.setCurrentIndex(i)
-                                break
+        values = {column: value for column, value in ((COL_SITE, site_id), (COL_ROLE, role_id),
+                                                      (COL_PLATFORM, platform_id))
+                  if value and value in self._combo_rows.get(column, {})}
+        self._model.set_values(self.selected_rows, values)
 
 
 def create_combo_with_items(items: List, default_text: str = "-- Select --", id_attr: str = "id",
@@ -348,18 +582,8 @@ def populate_combo_from_netbox_data(combo: QComboBox, items: List, default_text:
 
 def set_combo_by_data(combo: QComboBox, data_value):
     """Helper function to set combo box selection by data value"""
-    for i in range(combo.count()):
-        if combo.itemData(i) == data_value:
-            combo.setCurrentIndex(i)
-            return True
-    return False
-
-
-def get_table_selection_count(table: QTableWidget, checkbox_column: int = 0) -> int:
-    """Helper function to count selected checkboxes in a table"""
-    count = 0
-    for row in range(table.rowCount()):
-        checkbox = table.cellWidget(row, checkbox_column)
-        if checkbox and checkbox.isChecked():
-            count += 1
-    return count
\ No newline at end of file
+    index = combo.findData(data_value)
+    if index < 0:
+        return False
+    combo.setCurrentIndex(index)
+    return True